@@ -1,10 +1,25 @@
 import os
+import sys
+import csv
+import gzip
 import json
 import asyncio
-from datetime import datetime
+import sqlite3
+import hashlib
+import time
+import bisect
+import heapq
+import functools
+import contextlib
+import hmac
+import threading
+import multiprocessing
+from collections import Counter
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 import aiosqlite
 import aiohttp
+from aiohttp import web
 import interactions
 from interactions import (
     Button,
@@ -14,6 +29,14 @@ from interactions import (
     Modal,
     ShortText
 )
+from interactions import application_commands_to_dict
+
+try:
+    # Only needed to verify requests on the HTTP interactions endpoint
+    from nacl.signing import VerifyKey
+    from nacl.exceptions import BadSignatureError
+except ImportError:
+    VerifyKey = None
 
 # ============================================================
 #                        CONFIG / INIT
@@ -25,7 +48,8 @@ BOT_ID = 1450840919615078440
 
 bot = interactions.Client(
     token=TOKEN,
-    sync_commands=True,
+    # Commands are only synced when their schema hash changes (see on_ready)
+    sync_interactions=False,
     # default_scope=int(os.getenv("GUILD_ID")),
     intents=interactions.Intents.ALL
 )
@@ -36,14 +60,402 @@ TASK_ADMIN_CHANNEL_ID = None
 JOB_CHANNEL_ID = None
 JOB_ADMIN_CHANNEL_ID = None
 
+startup_task = None
+outbox_task = None
+outbox_wakeup = asyncio.Event()
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_SEND_INTERVAL = 0.25   # seconds between two channel sends
+# Failures worth another attempt: Discord errors, dropped connections and timeouts
+OUTBOX_RETRY_ERRORS = (interactions.errors.HTTPException, aiohttp.ClientError, asyncio.TimeoutError)
+
+sweeper_task = None
+SWEEP_INTERVAL = 60           # seconds between two lifecycle sweeps
+SWEEP_BATCH_SIZE = 50
+SWEEP_EDIT_INTERVAL = 0.5     # seconds between two message edits
+
+backup_task = None
+backup_lock = asyncio.Lock()
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 7               # rotated snapshots kept on disk
+BACKUP_INTERVAL = 6 * 3600    # seconds between two scheduled backups
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.05      # seconds the source is left unlocked between two steps
+BACKUP_MAX_SECONDS = 600      # a backup still running after this long is aborted
+
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_SIZE = 5000      # ledger rows fetched from the cursor at a time
+PROFILE_INTERVAL = 0.005      # seconds between two stack samples
+PROFILE_MAX_SECONDS = 120
+PROFILE_TOP = 15              # functions listed in the /admin profile summary
+profile_lock = asyncio.Lock()
+
+EXPORT_COLUMNS = ("id", "date", "sender_discord_id", "receiver_discord_id", "amount", "is_task_reward", "is_job_reward", "is_tax")
+
+THROTTLE_MAX_KEYS = 10000     # buckets kept before idle ones are pruned
+
+bridge_runner = None
+BRIDGE_TOKEN = os.getenv("BRIDGE_TOKEN")
+BRIDGE_HOST = os.getenv("BRIDGE_HOST", "127.0.0.1")
+BRIDGE_PORT = int(os.getenv("BRIDGE_PORT", "8765"))
+BRIDGE_MAX_BATCH = 500        # UUIDs per batched balance request
+
+recorder = None
+RECORD_PATH = os.getenv("RECORD_INTERACTIONS")   # opt-in JSONL capture for replay.py
+
+# Set INTERACTIONS_WORKERS to serve interactions over HTTP from that many processes;
+# the gateway process then only handles messages and the background workers
+interaction_workers = []
+cache_task = None
+INTERACTIONS_WORKERS = int(os.getenv("INTERACTIONS_WORKERS", "0"))
+INTERACTIONS_HOST = os.getenv("INTERACTIONS_HOST", "0.0.0.0")
+INTERACTIONS_PORT = int(os.getenv("INTERACTIONS_PORT", "8080"))
+INTERACTIONS_PUBLIC_KEY = os.getenv("DISCORD_PUBLIC_KEY")
+TRIGRAM_RARE_GRAMS = 3        # minimum number of a query's rarest trigrams used to find candidates
+TRIGRAM_SCAN_LIMIT = 500      # candidates gathered before the length walk stops
+TRIGRAM_SHORTLIST = 50        # candidates scored exactly per "did you mean" lookup
+CACHE_REFRESH_INTERVAL = 2    # seconds between two checks for writes from other processes
+CACHED_TABLES = ("tasks", "jobs", "config", "admin_sessions")   # tables whose writes bump meta.<table>_version
+
+# Columns added to tasks and jobs for their open/closed/expired lifecycle
+LIFECYCLE_COLUMNS = [
+    ("status", "TEXT NOT NULL DEFAULT 'open'"),
+    ("expires_at", "INTEGER DEFAULT NULL"),
+    ("max_claimers", "INTEGER DEFAULT NULL"),
+    ("claim_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("channel_id", "INTEGER DEFAULT NULL"),
+]
+
+salary_task = None
+salary_wakeup = asyncio.Event()
+SALARY_CHECK_INTERVAL = 60    # seconds between two salary runs
+SALARY_DEFAULT_INTERVAL_HOURS = 24
+
+tax_task = None
+
+
+# ============================================================
+#                     IN-MEMORY NAME INDEXES
+# ============================================================
+
+class PrefixIndex:
+    """Sorted list of names supporting case-insensitive prefix lookups."""
+
+    def __init__(self):
+        self._keys = []    # sorted lowercase names
+        self._names = {}   # lowercase name -> display name
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, name: str):
+        key = name.lower()
+        if key not in self._names:
+            bisect.insort(self._keys, key)
+        self._names[key] = name
+
+    def remove(self, name: str):
+        key = name.lower()
+        if self._names.pop(key, None) is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def search(self, prefix: str, limit: int = 25):
+        prefix = prefix.lower()
+        results = []
+        for key in self._keys[bisect.bisect_left(self._keys, prefix):]:
+            if not key.startswith(prefix) or len(results) == limit:
+                break
+            results.append(self._names[key])
+        return results
+
+
+class ClaimIndex:
+    """Open tasks or jobs by name, with the Minecraft usernames currently claiming each one."""
+
+    def __init__(self):
+        self.names = PrefixIndex()
+        self.claimers = {}   # lowercase item name -> PrefixIndex of Minecraft usernames
+
+    def add_item(self, name: str):
+        self.names.add(name)
+        self.claimers.setdefault(name.lower(), PrefixIndex())
+
+    def remove_item(self, name: str):
+        self.names.remove(name)
+        self.claimers.pop(name.lower(), None)
+
+    def add_claimer(self, name: str, minecraft_username: str):
+        self.add_item(name)
+        self.claimers[name.lower()].add(minecraft_username)
+
+    def remove_claimer(self, name: str, minecraft_username: str):
+        if name.lower() in self.claimers:
+            self.claimers[name.lower()].remove(minecraft_username)
+
+    def search_claimers(self, name: str, prefix: str, limit: int = 25):
+        claimers = self.claimers.get(name.lower())
+        return claimers.search(prefix, limit) if claimers else []
+
+
+class TrigramIndex:
+    """Names by their character trigrams, for ranked "did you mean" suggestions on typos."""
+
+    def __init__(self):
+        self._postings = {}   # trigram -> {name length -> set of lowercase names}
+        self._names = {}      # lowercase name -> display name
+
+    @staticmethod
+    def trigrams(key: str):
+        padded = f" {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, name: str):
+        key = name.lower()
+        if key not in self._names:
+            for gram in self.trigrams(key):
+                self._postings.setdefault(gram, {}).setdefault(len(key), set()).add(key)
+        self._names[key] = name
+
+    def remove(self, name: str):
+        key = name.lower()
+        if self._names.pop(key, None) is not None:
+            for gram in self.trigrams(key):
+                self._postings[gram][len(key)].discard(key)
+
+    def suggest(self, query: str, limit: int = 3, min_score: float = 0.4):
+        """Names sharing the most trigrams with `query`, best first (Dice coefficient)."""
+        query = query.lower()
+        grams = self.trigrams(query)
+        # Common trigrams ("gam", "pro", ...) have huge postings, candidates only come from the rarest ones
+        postings = sorted(
+            (self._postings[gram] for gram in grams if gram in self._postings),
+            key=lambda by_length: sum(map(len, by_length.values()))
+        )
+        rare = postings[:max(TRIGRAM_RARE_GRAMS, len(postings) // 2)]
+
+        # Collect candidates walking outwards from the query's length (closer lengths can score
+        # higher) until enough are found, then score only the best-matching shortlist exactly
+        size = len(query)
+        low = size * min_score / (2 - min_score)
+        high = size * (2 - min_score) / min_score
+        hits = Counter()
+        for distance in range(int(high) + 1):
+            lengths = [length for length in {size - distance, size + distance} if low <= length <= high]
+            for by_length in rare:
+                for length in lengths:
+                    hits.update(by_length.get(length, ()))
+            if len(hits) >= TRIGRAM_SCAN_LIMIT:
+                break
+
+        scored = []
+        for key, _ in hits.most_common(TRIGRAM_SHORTLIST):
+            key_grams = self.trigrams(key)
+            score = 2 * len(grams & key_grams) / (len(grams) + len(key_grams))
+            if score >= min_score:
+                scored.append((score, key))
+        scored = heapq.nlargest(limit, scored)
+        return [self._names[key] for _, key in scored]
+
+
+task_index = ClaimIndex()
+job_index = ClaimIndex()
+player_index = PrefixIndex()     # linked Minecraft usernames
+player_trigrams = TrigramIndex()
+admin_sessions = {}              # {discord_id: channel_id}, this process's copy of the admin_sessions table
+
+
+# ============================================================
+#                   LOCKS & CLICK THROTTLING
+# ============================================================
+
+class LockRegistry:
+    """Per-key asyncio locks, dropped as soon as nobody holds or waits for them."""
+
+    def __init__(self):
+        self._locks = {}   # key -> [lock, holders + waiters]
+
+    def __len__(self):
+        return len(self._locks)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *keys):
+        # A fixed acquisition order keeps two multi-key holders from deadlocking
+        entries = []
+        for key in sorted(set(keys), key=str):
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((key, entry))
+
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class TokenBucket:
+    """Token buckets keyed by anything, refilled at `rate` tokens per second up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}   # key -> [tokens, last refill]
+
+    def allow(self, key) -> bool:
+        now = time.monotonic()
+        if len(self._buckets) > THROTTLE_MAX_KEYS:
+            self._prune(now)
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = [tokens, now]
+            return False
+        self._buckets[key] = [tokens - 1, now]
+        return True
+
+    def _prune(self, now: float):
+        """Forget buckets that have refilled completely."""
+        full_after = self.burst / self.rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+
+
+locks = LockRegistry()
+user_throttle = TokenBucket(rate=1, burst=5)
+button_throttle = TokenBucket(rate=0.5, burst=2)
+
+
+def throttled(func):
+    """Rejects click floods per user and per user/custom_id before the handler runs."""
+    @functools.wraps(func)
+    async def wrapper(ctx, *args, **kwargs):
+        target = getattr(ctx, "custom_id", None) or ctx.invoke_target
+        if not (user_throttle.allow(ctx.author.id) and button_throttle.allow((ctx.author.id, target))):
+            return await ctx.send("⏳ Too many clicks, try again in a moment.", ephemeral=True)
+        return await func(ctx, *args, **kwargs)
+    return wrapper
+
+
+def account_locked(func):
+    """Serializes the handler with every other operation on the author's account.
+
+    Only within this process: with HTTP workers, handlers that must not run twice
+    also guard their writes in SQL (conditional updates, UNIQUE constraints).
+    """
+    @functools.wraps(func)
+    async def wrapper(ctx, *args, **kwargs):
+        async with locks.hold(ctx.author.id):
+            return await func(ctx, *args, **kwargs)
+    return wrapper
 
 # ============================================================
 #                        DATABASE SETUP
 # ============================================================
 
+def uuid_to_blob(minecraft_uuid) -> bytes:
+    """Minecraft UUIDs are stored as 16 raw bytes; admin accounts use their Discord ID instead."""
+    if minecraft_uuid is None:
+        return None
+    hex_uuid = str(minecraft_uuid).replace("-", "")
+    if len(hex_uuid) == 32:
+        return bytes.fromhex(hex_uuid)
+    return int(minecraft_uuid).to_bytes(16, "big")
+
+
+def blob_to_uuid(blob: bytes) -> str:
+    return blob.hex() if blob is not None else None
+
+
+def timestamp_sql(column: str) -> str:
+    """SQL converting a DATETIME text column (UTC) to epoch seconds."""
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+async def get_column_types(db: aiosqlite.Connection, table: str) -> dict:
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    return {row[1]: row[2].upper() for row in await cursor.fetchall()}
+
+
+async def add_missing_columns(db: aiosqlite.Connection, table: str, columns: list):
+    """Add columns that older databases don't have yet."""
+    existing = await get_column_types(db, table)
+    if not existing:
+        return
+    for name, definition in columns:
+        if name not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+async def rename_legacy_tables(db: aiosqlite.Connection) -> list:
+    """Renames tables still using TEXT UUIDs or DATETIME text columns to <table>_legacy."""
+    legacy = []
+    for table in ("users", "transactions", "tasks", "jobs", "tasks_archive", "jobs_archive"):
+        types = await get_column_types(db, table)
+        if "DATETIME" in types.values() or types.get("minecraft_uuid") == "TEXT":
+            await db.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            legacy.append(table)
+    return legacy
+
+
+async def copy_legacy_tables(db: aiosqlite.Connection, tables: list):
+    """Copies renamed legacy tables into the compact layout, then drops them."""
+    for table in tables:
+        legacy = f"{table}_legacy"
+        if table == "users":
+            cursor = await db.execute(
+                f"SELECT id, discord_id, discord_username, minecraft_username, minecraft_uuid, money, has_bank, bank_channel_id, {timestamp_sql('joined')} FROM {legacy}"
+            )
+            rows = await cursor.fetchall()
+            await db.executemany(
+                "INSERT INTO users (id, discord_id, discord_username, minecraft_username, minecraft_uuid, money, has_bank, bank_channel_id, joined) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row[:4] + (uuid_to_blob(row[4]),) + row[5:] for row in rows]
+            )
+        elif table == "transactions":
+            await db.execute(
+                f"""INSERT INTO transactions (id, sender_discord_id, receiver_discord_id, is_task_reward, is_job_reward, amount, date)
+                SELECT id, sender_discord_id, receiver_discord_id, is_task_reward, is_job_reward, amount, {timestamp_sql('date')} FROM {legacy}"""
+            )
+        else:
+            columns = ItemRecord.columns() + (", archived_at" if table.endswith("_archive") else "")
+            selected = columns.replace("created_at", timestamp_sql("created_at"))
+            await db.execute(f"INSERT INTO {table} ({columns}) SELECT {selected} FROM {legacy}")
+
+            # Claim timestamps were local "%Y-%m-%d %H:%M:%S" strings
+            cursor = await db.execute(f"SELECT id, claimed_by_discord_ids FROM {table} WHERE claimed_by_discord_ids IS NOT NULL")
+            updates = []
+            for item_id, raw_claimed_by in await cursor.fetchall():
+                claimed_by = {
+                    discord_id: int(datetime.strptime(claimed_at, "%Y-%m-%d %H:%M:%S").timestamp()) if isinstance(claimed_at, str) else claimed_at
+                    for discord_id, claimed_at in json.loads(raw_claimed_by).items()
+                }
+                updates.append((json.dumps(claimed_by), item_id))
+            await db.executemany(f"UPDATE {table} SET claimed_by_discord_ids = ? WHERE id = ?", updates)
+
+        await db.execute(f"DROP TABLE {legacy}")
+        print(f"Migrated {table} to the compact storage layout.")
+
+
 async def init_db():
     """Create SQLite tables if they don't exist."""
     async with aiosqlite.connect("bank.db") as db:
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("BEGIN")
+
+        # Databases from before the compact storage layout are moved aside and copied back below
+        for table in ("tasks", "jobs"):
+            await add_missing_columns(db, table, LIFECYCLE_COLUMNS)
+        legacy_tables = await rename_legacy_tables(db)
 
         # Users table
         await db.execute("""
@@ -52,11 +464,11 @@ async def init_db():
             discord_id INTEGER UNIQUE,
             discord_username TEXT NOT NULL UNIQUE,
             minecraft_username TEXT NOT NULL UNIQUE,
-            minecraft_uuid TEXT NOT NULL UNIQUE,
+            minecraft_uuid BLOB NOT NULL UNIQUE,
             money INTEGER default 0,
             has_bank INTEGER default 0,
             bank_channel_id INTEGER default NULL UNIQUE,
-            joined DATETIME DEFAULT CURRENT_TIMESTAMP
+            joined INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
         );
         """)
 
@@ -69,10 +481,13 @@ async def init_db():
             is_task_reward INTEGER DEFAULT 0,
             is_job_reward INTEGER DEFAULT 0,
             amount INTEGER NOT NULL,
-            date DATETIME DEFAULT CURRENT_TIMESTAMP
+            date INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            is_tax INTEGER DEFAULT 0
         );
         """)
 
+        await add_missing_columns(db, "transactions", [("is_tax", "INTEGER DEFAULT 0")])
+
         # Task table
         await db.execute("""
         CREATE TABLE IF NOT EXISTS tasks (
@@ -83,7 +498,12 @@ async def init_db():
             reward INTEGER NOT NULL,
             author_discord_id INTEGER NOT NULL,
             claimed_by_discord_ids TEXT DEFAULT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            status TEXT NOT NULL DEFAULT 'open',
+            expires_at INTEGER DEFAULT NULL,
+            max_claimers INTEGER DEFAULT NULL,
+            claim_count INTEGER NOT NULL DEFAULT 0,
+            channel_id INTEGER DEFAULT NULL
         );
         """)
 
@@ -97,9 +517,53 @@ async def init_db():
             reward INTEGER NOT NULL,
             author_discord_id INTEGER NOT NULL,
             claimed_by_discord_ids TEXT DEFAULT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            status TEXT NOT NULL DEFAULT 'open',
+            expires_at INTEGER DEFAULT NULL,
+            max_claimers INTEGER DEFAULT NULL,
+            claim_count INTEGER NOT NULL DEFAULT 0,
+            channel_id INTEGER DEFAULT NULL,
+            pay_interval INTEGER NOT NULL DEFAULT 86400
+        );
+        """)
+        await add_missing_columns(db, "jobs", [("pay_interval", "INTEGER NOT NULL DEFAULT 86400")])
+
+        # Accepted job holders, paid `salary` every `pay_interval` seconds
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS job_holders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_message_id INTEGER NOT NULL,
+            job_name TEXT NOT NULL,
+            discord_id INTEGER NOT NULL,
+            salary INTEGER NOT NULL,
+            pay_interval INTEGER NOT NULL,
+            next_pay_at INTEGER NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            UNIQUE (job_message_id, discord_id)
         );
         """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_job_holders_next_pay ON job_holders (active, next_pay_at)")
+
+        # Archived tasks and jobs, moved out once closed and fully settled
+        for table in ("tasks_archive", "jobs_archive"):
+            await db.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                message_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT NOT NULL,
+                reward INTEGER NOT NULL,
+                author_discord_id INTEGER NOT NULL,
+                claimed_by_discord_ids TEXT DEFAULT NULL,
+                created_at INTEGER,
+                status TEXT NOT NULL,
+                expires_at INTEGER DEFAULT NULL,
+                max_claimers INTEGER DEFAULT NULL,
+                claim_count INTEGER NOT NULL DEFAULT 0,
+                channel_id INTEGER DEFAULT NULL,
+                archived_at INTEGER NOT NULL
+            );
+            """)
 
         # Config table
         await db.execute("""
@@ -112,45 +576,177 @@ async def init_db():
             job_admin_channel_id STRING
         );
         """)
+        await db.execute("INSERT OR IGNORE INTO config (id) VALUES (1)")
+
+        await copy_legacy_tables(db, legacy_tables)
+
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_transactions_sender ON transactions (sender_discord_id, date)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_transactions_receiver ON transactions (receiver_discord_id, date)")
+        for table in ("tasks", "jobs"):
+            await db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_status_expires ON {table} (status, expires_at)")
+
+        # Pending Discord notifications, written in the same transaction as the change they announce
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at INTEGER DEFAULT 0
+        );
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox (next_attempt_at)")
+
+        # Key/value state table
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """)
+
+        # Admins in the middle of the set-money flow, shared by every process
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS admin_sessions (
+            discord_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL
+        );
+        """)
+
+        # Writes to cached tables bump a counter so other processes reload only what changed
+        for table in CACHED_TABLES:
+            await db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, 0)", (f"{table}_version",))
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE meta SET value = value + 1 WHERE key = '{table}_version';
+                END;
+                """)
 
         await db.commit()
 
     print("Database initialized.")
 
 
+# ============================================================
+#                        RECORD TYPES
+# ============================================================
+
+class Record:
+    """Compact row type; subclasses list the columns they select in __slots__."""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+    @classmethod
+    def columns(cls):
+        return ", ".join(cls.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row) if row is not None else None
+
+
+class AccountRecord(Record):
+    """The users columns handlers work with."""
+    __slots__ = ("discord_id", "discord_username", "minecraft_username", "money", "has_bank", "bank_channel_id")
+
+
+class ItemRecord(Record):
+    """A full tasks or jobs row."""
+    __slots__ = ("id", "message_id", "name", "description", "reward", "author_discord_id", "claimed_by_discord_ids", "created_at", "status", "expires_at", "max_claimers", "claim_count", "channel_id")
+
+
 # ============================================================
 #                       DATABASE FUNCTIONS
 # ============================================================
 
 async def register_user_db(discord_id: int, discord_username: str, minecraft_username: str, minecraft_uuid: str):
+    """Returns False if the Discord account, username or UUID got linked by another process meanwhile."""
     async with aiosqlite.connect("bank.db") as db:
-        await db.execute(
-            "INSERT INTO users (discord_id, discord_username, minecraft_username, minecraft_uuid) VALUES (?, ?, ?, ?)",
-            (discord_id, discord_username, minecraft_username, minecraft_uuid)
-        )
+        try:
+            await db.execute(
+                "INSERT INTO users (discord_id, discord_username, minecraft_username, minecraft_uuid) VALUES (?, ?, ?, ?)",
+                (discord_id, discord_username, minecraft_username, uuid_to_blob(minecraft_uuid))
+            )
+        except sqlite3.IntegrityError:
+            return False
         await db.commit()
+    player_index.add(minecraft_username)
+    player_trigrams.add(minecraft_username)
+    return True
 
 
 async def get_user(discord_id: int = None, discord_username: str = None, minecraft_username: str = None, minecraft_uuid: str = None, bank_channel_id: int = None):
+    if discord_id is not None:
+        column, value = "discord_id", discord_id
+    elif discord_username is not None:
+        column, value = "discord_username", discord_username
+    elif minecraft_username is not None:
+        column, value = "minecraft_username", minecraft_username
+    elif minecraft_uuid is not None:
+        column, value = "minecraft_uuid", uuid_to_blob(minecraft_uuid)
+    elif bank_channel_id is not None:
+        column, value = "bank_channel_id", bank_channel_id
+    else:
+        return None
     async with aiosqlite.connect("bank.db") as db:
-        if discord_id is not None:
-            cursor = await db.execute("SELECT * FROM users WHERE discord_id = ?",
-            (discord_id,))
-        elif discord_username is not None:
-            cursor = await db.execute("SELECT * FROM users WHERE discord_username = ?",
-            (discord_username,))
-        elif minecraft_username is not None:
-            cursor = await db.execute("SELECT * FROM users WHERE minecraft_username = ?",
-            (minecraft_username,))
-        elif minecraft_uuid is not None:
-            cursor = await db.execute("SELECT * FROM users WHERE minecraft_uuid = ?",
-            (minecraft_uuid,))
-        elif bank_channel_id is not None:
-            cursor = await db.execute("SELECT * FROM users WHERE bank_channel_id = ?",
-            (bank_channel_id,))
-        else:
-            return None
-        return await cursor.fetchone()
+        cursor = await db.execute(
+            f"SELECT {AccountRecord.columns()} FROM users WHERE {column} = ?",
+            (value,)
+        )
+        return AccountRecord.from_row(await cursor.fetchone())
+
+
+async def get_balance(discord_id: int):
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "SELECT money FROM users WHERE discord_id = ?",
+            (discord_id,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def get_balances_by_uuid(minecraft_uuids: list) -> dict:
+    """Balances of many linked accounts in one query, keyed by hex UUID."""
+    if not minecraft_uuids:
+        return {}
+    placeholders = ", ".join("?" for _ in minecraft_uuids)
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            f"SELECT minecraft_uuid, money FROM users WHERE minecraft_uuid IN ({placeholders})",
+            [uuid_to_blob(minecraft_uuid) for minecraft_uuid in minecraft_uuids]
+        )
+        return {blob_to_uuid(blob): money for blob, money in await cursor.fetchall()}
+
+
+async def reserve_bank(discord_id: int):
+    """Marks the user as having a bank unless they already do. False if another process got there first."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "UPDATE users SET has_bank = 1 WHERE discord_id = ? AND has_bank = 0",
+            (discord_id,)
+        )
+        await db.commit()
+        return cursor.rowcount == 1
+
+
+async def release_bank(discord_id: int):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            "UPDATE users SET has_bank = 0 WHERE discord_id = ? AND bank_channel_id IS NULL",
+            (discord_id,)
+        )
+        await db.commit()
 
 
 async def update_user_bank(discord_id: int, bank_channel_id: int):
@@ -174,35 +770,289 @@ async def update_user_balance(discord_id: int, balance: int):
 async def get_minecraft_username(minecraft_username: str):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE minecraft_username = ?",
+            f"SELECT {AccountRecord.columns()} FROM users WHERE minecraft_username = ?",
             (minecraft_username,)
         )
-        return await cursor.fetchone()
+        return AccountRecord.from_row(await cursor.fetchone())
 
 
 async def get_minecraft_uuid(minecraft_uuid: str):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE minecraft_uuid = ?",
-            (minecraft_uuid,)
+            f"SELECT {AccountRecord.columns()} FROM users WHERE minecraft_uuid = ?",
+            (uuid_to_blob(minecraft_uuid),)
+        )
+        return AccountRecord.from_row(await cursor.fetchone())
+
+
+async def reward_user(discord_id: int, amount: int, is_task_reward: int = 0, is_job_reward: int = 0):
+    """Credits a task or job reward and logs it in one transaction."""
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            "UPDATE users SET money = money + ? WHERE discord_id = ?",
+            (amount, discord_id)
+        )
+        await db.execute(
+            "INSERT INTO transactions (sender_discord_id, receiver_discord_id, is_task_reward, is_job_reward, amount) VALUES (0, ?, ?, ?, ?)",
+            (discord_id, is_task_reward, is_job_reward, amount)
+        )
+        await db.commit()
+
+
+async def transfer_money(sender_discord_id: int, receiver_discord_id: int, amount: int, receipt_channel_id: int = None, receipt: str = None):
+    """Move money, log it and queue the receipt in one transaction. Returns False if the sender can't afford it."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "UPDATE users SET money = money - ? WHERE discord_id = ? AND money >= ?",
+            (amount, sender_discord_id, amount)
+        )
+        if cursor.rowcount == 0:
+            await db.rollback()
+            return False
+        await db.execute(
+            "UPDATE users SET money = money + ? WHERE discord_id = ?",
+            (amount, receiver_discord_id)
+        )
+        await db.execute(
+            "INSERT INTO transactions (sender_discord_id, receiver_discord_id, amount) VALUES (?, ?, ?)",
+            (sender_discord_id, receiver_discord_id, amount)
+        )
+        if receipt_channel_id is not None:
+            await db.execute(
+                "INSERT INTO outbox (channel_id, content) VALUES (?, ?)",
+                (receipt_channel_id, receipt)
+            )
+        await db.commit()
+    outbox_wakeup.set()
+    return True
+
+
+async def hire_job_holder(job_message_id: int, discord_id: int):
+    """Starts paying the job's salary to a holder, the first payment being due right away."""
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            """INSERT INTO job_holders (job_message_id, job_name, discord_id, salary, pay_interval, next_pay_at)
+            SELECT message_id, name, ?, reward, pay_interval, ? FROM jobs WHERE message_id = ?
+            ON CONFLICT (job_message_id, discord_id) DO UPDATE SET active = 1, next_pay_at = MAX(next_pay_at, excluded.next_pay_at)""",
+            (discord_id, int(time.time()), job_message_id)
+        )
+        await db.commit()
+    salary_wakeup.set()
+
+
+async def dismiss_job_holder(job_name: str, discord_id: int):
+    """Stops a holder's salary. Returns False if they weren't holding that job."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "UPDATE job_holders SET active = 0 WHERE job_name = ? AND discord_id = ? AND active = 1",
+            (job_name, discord_id)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def pay_due_salaries(now: int = None):
+    """Pays every salary that is due, missed periods included, in one transaction. Returns the number of payments."""
+    now = now or int(time.time())
+    async with aiosqlite.connect("bank.db") as db:
+        # Taking the write lock before reading keeps a dismissal or re-hire from landing between the two
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            """SELECT h.id, h.discord_id, h.job_name, h.salary, h.pay_interval, h.next_pay_at, u.bank_channel_id
+            FROM job_holders h JOIN users u ON u.discord_id = h.discord_id
+            WHERE h.active = 1 AND h.next_pay_at <= ?""",
+            (now,)
+        )
+        due = await cursor.fetchall()
+        if not due:
+            await db.rollback()
+            return 0
+
+        credits, ledger, schedule, receipts = [], [], [], []
+        for holder_id, discord_id, job_name, salary, pay_interval, next_pay_at, bank_channel_id in due:
+            # Every period started since next_pay_at is owed, even if the bot was down
+            periods = (now - next_pay_at) // pay_interval + 1
+            amount = salary * periods
+            credits.append((amount, discord_id))
+            ledger.append((discord_id, amount, now))
+            # Only moving next_pay_at forward in the same transaction makes a run safe to repeat
+            schedule.append((next_pay_at + periods * pay_interval, holder_id, next_pay_at))
+            if bank_channel_id is not None:
+                receipts.append((bank_channel_id, f"💼 Salary for **{job_name}**: **{amount}** social credits."))
+
+        await db.executemany("UPDATE users SET money = money + ? WHERE discord_id = ?", credits)
+        await db.executemany(
+            "INSERT INTO transactions (sender_discord_id, receiver_discord_id, is_job_reward, amount, date) VALUES (0, ?, 1, ?, ?)",
+            ledger
+        )
+        await db.executemany("UPDATE job_holders SET next_pay_at = ? WHERE id = ? AND next_pay_at = ?", schedule)
+        await db.executemany("INSERT INTO outbox (channel_id, content) VALUES (?, ?)", receipts)
+        await db.commit()
+
+    outbox_wakeup.set()
+    return len(due)
+
+
+def tax_sql(rate_bp: int, threshold: int):
+    """Tax owed on each balance above `threshold`, `rate_bp` basis points of the excess."""
+    return f"((money - {int(threshold)}) * {int(rate_bp)} / 10000)"
+
+
+async def preview_tax(rate_bp: int, threshold: int):
+    """Dry run of the tax sweep: number of payers, total collected and the largest payments."""
+    tax = tax_sql(rate_bp, threshold)
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(f"SELECT COUNT(*), COALESCE(SUM({tax}), 0) FROM users WHERE {tax} > 0")
+        payers, total = await cursor.fetchone()
+        cursor = await db.execute(
+            f"SELECT discord_id, money, {tax} FROM users WHERE {tax} > 0 ORDER BY money DESC LIMIT 5"
+        )
+        return payers, total, await cursor.fetchall()
+
+
+async def collect_tax(rate_bp: int, threshold: int, interval: int = None):
+    """
+    Taxes every qualifying balance with one INSERT ... SELECT and one UPDATE and records last_tax_at
+    in the same transaction. Returns payers and total, or None if `interval` is given and the last
+    sweep is more recent than that.
+    """
+    tax = tax_sql(rate_bp, threshold)
+    now = int(time.time())
+    async with aiosqlite.connect("bank.db") as db:
+        # Taking the write lock first keeps the ledger rows and the debits computed from the same balances,
+        # and makes the last_tax_at check authoritative against other runs and processes
+        await db.execute("BEGIN IMMEDIATE")
+        if interval is not None:
+            cursor = await db.execute("SELECT value FROM meta WHERE key = 'last_tax_at'")
+            row = await cursor.fetchone()
+            if row and int(row[0]) + interval > now:
+                await db.rollback()
+                return None
+        cursor = await db.execute(f"SELECT COUNT(*), COALESCE(SUM({tax}), 0) FROM users WHERE {tax} > 0")
+        payers, total = await cursor.fetchone()
+        await db.execute(
+            f"""INSERT INTO transactions (sender_discord_id, receiver_discord_id, is_tax, amount, date)
+            SELECT discord_id, 0, 1, {tax}, ? FROM users WHERE {tax} > 0""",
+            (now,)
+        )
+        await db.execute(f"UPDATE users SET money = money - {tax} WHERE {tax} > 0")
+        await db.execute(
+            "INSERT INTO meta (key, value) VALUES ('last_tax_at', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(now),)
+        )
+        await db.commit()
+        return payers, total
+
+
+async def set_item_status(table: str, message_id: int, status: str):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            f"UPDATE {table} SET status = ? WHERE message_id = ?",
+            (status, message_id)
+        )
+        await db.commit()
+
+
+async def expire_due_items(table: str, limit: int = SWEEP_BATCH_SIZE):
+    """Marks a batch of open items past their deadline as expired and returns them."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            f"SELECT id, message_id, channel_id FROM {table} WHERE status = 'open' AND expires_at <= ? LIMIT ?",
+            (int(time.time()), limit)
+        )
+        rows = await cursor.fetchall()
+        await db.executemany(
+            f"UPDATE {table} SET status = 'expired' WHERE id = ?",
+            [(row[0],) for row in rows]
         )
-        return await cursor.fetchone()
+        await db.commit()
+        return rows
 
 
-async def log_transaction(sender_discord_id: int, receiver_discord_id: int, is_task_reward: int = 0, is_job_reward: int = 0, amount: int = 0):
+async def archive_settled_items(table: str, limit: int = SWEEP_BATCH_SIZE):
+    """Moves a batch of closed or expired items without pending claims to the archive. Returns their names."""
+    columns = ItemRecord.columns()
     async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            f"""SELECT id, name FROM {table} WHERE status != 'open'
+            AND (claimed_by_discord_ids IS NULL OR claimed_by_discord_ids = '{{}}') LIMIT ?""",
+            (limit,)
+        )
+        rows = await cursor.fetchall()
+        if not rows:
+            return []
+        ids = ",".join(str(row[0]) for row in rows)
         await db.execute(
-            "INSERT INTO transactions (sender_discord_id, receiver_discord_id, is_task_reward, is_job_reward, amount) VALUES (?, ?, ?, ?, ?)",
-            (sender_discord_id, receiver_discord_id, is_task_reward, is_job_reward, amount)
+            f"INSERT INTO {table}_archive ({columns}, archived_at) SELECT {columns}, ? FROM {table} WHERE id IN ({ids})",
+            (int(time.time()),)
         )
+        await db.execute(f"DELETE FROM {table} WHERE id IN ({ids})")
         await db.commit()
+        return [row[1] for row in rows]
+
+
+async def get_due_notifications(limit: int = OUTBOX_BATCH_SIZE):
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "SELECT id, channel_id, content, attempts FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (int(time.time()), limit)
+        )
+        return await cursor.fetchall()
+
+
+async def delete_notifications(ids: list):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+        await db.commit()
+
+
+async def retry_notifications(ids: list, attempts: int):
+    """Push notifications back with an exponential backoff."""
+    next_attempt_at = int(time.time()) + min(2 ** attempts, 600)
+    async with aiosqlite.connect("bank.db") as db:
+        await db.executemany(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+            [(attempts, next_attempt_at, i) for i in ids]
+        )
+        await db.commit()
+
 
+async def iter_transactions(discord_id: int = None, since: int = None, until: int = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yields ledger rows in chunks straight from the cursor, oldest first."""
+    conditions, params = [], []
+    if discord_id is not None:
+        conditions.append("(sender_discord_id = ? OR receiver_discord_id = ?)")
+        params += [discord_id, discord_id]
+    if since is not None:
+        conditions.append("date >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("date < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-async def create_task(message_id: int, name: str, description: str, reward: int, author_discord_id: int):
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            f"""SELECT id, strftime('%Y-%m-%dT%H:%M:%SZ', date, 'unixepoch'), sender_discord_id, receiver_discord_id, amount, is_task_reward, is_job_reward, is_tax
+            FROM transactions {where} ORDER BY id""",
+            params
+        )
+        while rows := await cursor.fetchmany(chunk_size):
+            yield rows
+
+
+async def item_name_taken(table: str, name: str):
+    """True if an unarchived task or job already uses this name, ignoring case like the name indexes do."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(f"SELECT 1 FROM {table} WHERE name = ? COLLATE NOCASE LIMIT 1", (name,))
+        return await cursor.fetchone() is not None
+
+
+async def create_task(message_id: int, name: str, description: str, reward: int, author_discord_id: int, channel_id: int = None, expires_at: int = None, max_claimers: int = None):
     async with aiosqlite.connect("bank.db") as db:
         await db.execute(
-            "INSERT INTO tasks (message_id, name, description, reward, author_discord_id) VALUES (?, ?, ?, ?, ?)",
-            (message_id, name, description, reward, author_discord_id)
+            "INSERT INTO tasks (message_id, name, description, reward, author_discord_id, channel_id, expires_at, max_claimers) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (message_id, name, description, reward, author_discord_id, channel_id, expires_at, max_claimers)
         )
         await db.commit()
 
@@ -210,35 +1060,54 @@ async def create_task(message_id: int, name: str, description: str, reward: int,
 async def get_task(message_id: int):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE message_id = ?",
+            f"SELECT {ItemRecord.columns()} FROM tasks WHERE message_id = ?",
             (message_id,)
         )
-        return await cursor.fetchone()
+        return ItemRecord.from_row(await cursor.fetchone())
 
 
 async def get_task_from_name(name: str):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE name = ?",
+            f"SELECT {ItemRecord.columns()} FROM tasks WHERE name = ?",
             (name,)
         )
-        return await cursor.fetchone()
+        return ItemRecord.from_row(await cursor.fetchone())
 
 
-async def change_task_claimed_by(message_id: int, claimed_by_discord_ids: str):
+async def change_task_claimed_by(message_id: int, claimed_by_discord_ids: str, expected: str):
+    """Replaces the claims only if they still equal `expected`. Returns False if another process changed them first."""
     async with aiosqlite.connect("bank.db") as db:
-        await db.execute(
-            "UPDATE tasks SET claimed_by_discord_ids = ? WHERE message_id = ?",
-            (claimed_by_discord_ids, message_id)
+        cursor = await db.execute(
+            "UPDATE tasks SET claimed_by_discord_ids = ? WHERE message_id = ? AND claimed_by_discord_ids IS ?",
+            (claimed_by_discord_ids, message_id, expected)
         )
         await db.commit()
+        return cursor.rowcount == 1
 
 
-async def create_job(message_id: int, name: str, description: str, reward: int, author_discord_id: int):
+async def claim_task(message_id: int, claimed_by_discord_ids: str, expected: str):
+    """Stores a new claim, closing the task once it reaches its claimer limit. Returns the new status, None if the claims changed meanwhile."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            """UPDATE tasks SET claimed_by_discord_ids = ?, claim_count = claim_count + 1,
+            status = CASE WHEN max_claimers IS NOT NULL AND claim_count + 1 >= max_claimers THEN 'closed' ELSE status END
+            WHERE message_id = ? AND claimed_by_discord_ids IS ?""",
+            (claimed_by_discord_ids, message_id, expected)
+        )
+        if cursor.rowcount != 1:
+            return None
+        cursor = await db.execute("SELECT status FROM tasks WHERE message_id = ?", (message_id,))
+        row = await cursor.fetchone()
+        await db.commit()
+        return row[0]
+
+
+async def create_job(message_id: int, name: str, description: str, reward: int, author_discord_id: int, channel_id: int = None, expires_at: int = None, max_claimers: int = None, pay_interval: int = SALARY_DEFAULT_INTERVAL_HOURS * 3600):
     async with aiosqlite.connect("bank.db") as db:
         await db.execute(
-            "INSERT INTO jobs (message_id, name, description, reward, author_discord_id) VALUES (?, ?, ?, ?, ?)",
-            (message_id, name, description, reward, author_discord_id)
+            "INSERT INTO jobs (message_id, name, description, reward, author_discord_id, channel_id, expires_at, max_claimers, pay_interval) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (message_id, name, description, reward, author_discord_id, channel_id, expires_at, max_claimers, pay_interval)
         )
         await db.commit()
 
@@ -246,32 +1115,51 @@ async def create_job(message_id: int, name: str, description: str, reward: int,
 async def get_job(message_id: int):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM jobs WHERE message_id = ?",
+            f"SELECT {ItemRecord.columns()} FROM jobs WHERE message_id = ?",
             (message_id,)
         )
-        return await cursor.fetchone()
+        return ItemRecord.from_row(await cursor.fetchone())
 
 
 async def get_job_from_name(name: str):
     async with aiosqlite.connect("bank.db") as db:
         cursor = await db.execute(
-            "SELECT * FROM jobs WHERE name = ?",
+            f"SELECT {ItemRecord.columns()} FROM jobs WHERE name = ?",
             (name,)
         )
-        return await cursor.fetchone()
+        return ItemRecord.from_row(await cursor.fetchone())
 
 
-async def change_job_claimed_by(message_id: int, claimed_by_discord_ids: str):
+async def change_job_claimed_by(message_id: int, claimed_by_discord_ids: str, expected: str):
+    """Replaces the claims only if they still equal `expected`. Returns False if another process changed them first."""
     async with aiosqlite.connect("bank.db") as db:
-        await db.execute(
-            "UPDATE jobs SET claimed_by_discord_ids = ? WHERE message_id = ?",
-            (claimed_by_discord_ids, message_id)
+        cursor = await db.execute(
+            "UPDATE jobs SET claimed_by_discord_ids = ? WHERE message_id = ? AND claimed_by_discord_ids IS ?",
+            (claimed_by_discord_ids, message_id, expected)
         )
         await db.commit()
+        return cursor.rowcount == 1
+
+
+async def claim_job(message_id: int, claimed_by_discord_ids: str, expected: str):
+    """Stores a new claim, closing the job once it reaches its claimer limit. Returns the new status, None if the claims changed meanwhile."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            """UPDATE jobs SET claimed_by_discord_ids = ?, claim_count = claim_count + 1,
+            status = CASE WHEN max_claimers IS NOT NULL AND claim_count + 1 >= max_claimers THEN 'closed' ELSE status END
+            WHERE message_id = ? AND claimed_by_discord_ids IS ?""",
+            (claimed_by_discord_ids, message_id, expected)
+        )
+        if cursor.rowcount != 1:
+            return None
+        cursor = await db.execute("SELECT status FROM jobs WHERE message_id = ?", (message_id,))
+        row = await cursor.fetchone()
+        await db.commit()
+        return row[0]
 
 
 async def change_config(bank_category_id: str = None, task_channel_id: str = None, task_admin_channel_id: str = None, job_channel_id: str = None, job_admin_channel_id: str = None):
-    global CATEGORY_ID, TASK_CHANNEL_ID, TASK_ADMIN_CHHANNEL_ID, JOB_CHANNEL_ID, JOB_ADMIN_CHANNEL_ID
+    global CATEGORY_ID, TASK_CHANNEL_ID, TASK_ADMIN_CHANNEL_ID, JOB_CHANNEL_ID, JOB_ADMIN_CHANNEL_ID
     async with aiosqlite.connect("bank.db") as db:
         if bank_category_id is not None:
             await db.execute(
@@ -290,7 +1178,7 @@ async def change_config(bank_category_id: str = None, task_channel_id: str = Non
                 "UPDATE config SET task_admin_channel_id = ? WHERE id = 1",
                 (task_admin_channel_id,)
             )
-            TASK_ADMIN_CHHANNEL_ID = int(task_admin_channel_id)
+            TASK_ADMIN_CHANNEL_ID = int(task_admin_channel_id)
         if job_channel_id is not None:
             await db.execute(
                 "UPDATE config SET job_channel_id = ? WHERE id = 1",
@@ -306,43 +1194,796 @@ async def change_config(bank_category_id: str = None, task_channel_id: str = Non
         await db.commit()
 
 
+async def load_player_index(index: PrefixIndex, trigrams: TrigramIndex, after_id: int = 0):
+    """Fill the Minecraft username indexes from the users table, from `after_id` on."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute("SELECT minecraft_username FROM users WHERE id > ?", (after_id,))
+        for (minecraft_username,) in await cursor.fetchall():
+            index.add(minecraft_username)
+            trigrams.add(minecraft_username)
+
+
+def did_you_mean(minecraft_username: str):
+    suggestions = player_trigrams.suggest(minecraft_username)
+    if not suggestions:
+        return ""
+    return " Did you mean " + " or ".join(f"**{name}**" for name in suggestions) + "?"
+
+
+async def load_claim_index(table: str, index: ClaimIndex):
+    """Fill a claim index from the tasks or jobs table."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(f"SELECT name FROM {table}")
+        for (name,) in await cursor.fetchall():
+            index.add_item(name)
+        # Claims are {discord_id: claimed_at}; only the claimers' rows of users are read
+        cursor = await db.execute(f"""
+            SELECT items.name, users.minecraft_username
+            FROM {table} AS items
+            JOIN json_each(items.claimed_by_discord_ids) AS claims
+            JOIN users ON users.discord_id = CAST(claims.key AS INTEGER)
+            WHERE json_valid(items.claimed_by_discord_ids)
+        """)
+        for name, minecraft_username in await cursor.fetchall():
+            index.add_claimer(name, minecraft_username)
+
+
+async def get_cache_markers():
+    """Change counters for the cached tables (bumped by triggers) and the newest user id."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            f"SELECT key, value FROM meta WHERE key IN ({', '.join('?' * len(CACHED_TABLES))})",
+            [f"{table}_version" for table in CACHED_TABLES]
+        )
+        markers = dict(await cursor.fetchall())
+        cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+        (markers["users"],) = await cursor.fetchone()
+    return markers
+
+
+async def load_config():
+    """Load the channel/category IDs stored in the config table."""
+    global CATEGORY_ID, TASK_CHANNEL_ID, TASK_ADMIN_CHANNEL_ID, JOB_CHANNEL_ID, JOB_ADMIN_CHANNEL_ID
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute(
+            "SELECT category_id, task_channel_id, task_admin_channel_id, job_channel_id, job_admin_channel_id FROM config WHERE id = 1"
+        )
+        row = await cursor.fetchone()
+    if row is None:
+        return
+    CATEGORY_ID, TASK_CHANNEL_ID, TASK_ADMIN_CHANNEL_ID, JOB_CHANNEL_ID, JOB_ADMIN_CHANNEL_ID = (
+        int(value) if value is not None else None for value in row
+    )
+
+
+async def get_meta(key: str):
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def set_meta(key: str, value: str):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+        await db.commit()
+
+
+async def load_admin_sessions():
+    """Copies the admin_sessions table into admin_sessions, which the message listener reads."""
+    async with aiosqlite.connect("bank.db") as db:
+        cursor = await db.execute("SELECT discord_id, channel_id FROM admin_sessions")
+        rows = await cursor.fetchall()
+    admin_sessions.clear()
+    admin_sessions.update(rows)
+
+
+async def start_admin_session(discord_id: int, channel_id: int):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute(
+            "INSERT INTO admin_sessions (discord_id, channel_id) VALUES (?, ?) ON CONFLICT(discord_id) DO UPDATE SET channel_id = excluded.channel_id",
+            (discord_id, channel_id)
+        )
+        await db.commit()
+    admin_sessions[discord_id] = channel_id
+
+
+async def end_admin_session(discord_id: int):
+    async with aiosqlite.connect("bank.db") as db:
+        await db.execute("DELETE FROM admin_sessions WHERE discord_id = ?", (discord_id,))
+        await db.commit()
+    admin_sessions.pop(discord_id, None)
+
+
+# ============================================================
+#                     MOJANG API CHECK
+# ============================================================
+
+async def get_minecraft_profile(username: str):
+    """Check Mojang API for username → UUID."""
+    url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+
+            if response.status == 200:
+                data = await response.json()
+                return {
+                    "exists": True,
+                    "uuid": data["id"],
+                    "username": data["name"]
+                }
+
+            elif response.status in (204, 404):
+                return {"exists": False, "uuid": None, "username": None}
+
+            return {
+                "exists": False,
+                "uuid": None,
+                "username": None,
+                "error": f"Mojang API error {response.status}"
+            }
+
+
+# ============================================================
+#                     NOTIFICATION OUTBOX
+# ============================================================
+
+async def retry_or_drop_notifications(channel_id: int, ids: list, attempts: int, error: Exception):
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        print(f"Outbox: giving up on channel {channel_id} after {attempts} attempts ({error!r}).")
+        return await delete_notifications(ids)
+    await retry_notifications(ids, attempts)
+
+
+async def deliver_notifications(channel_id: int, rows: list):
+    """Send a batch of queued messages for one channel, merged into as few messages as possible."""
+    ids = [row[0] for row in rows]
+    attempts = max(row[3] for row in rows) + 1
+
+    try:
+        channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+    except (interactions.errors.NotFound, interactions.errors.Forbidden):
+        channel = None
+    except OUTBOX_RETRY_ERRORS as e:
+        return await retry_or_drop_notifications(channel_id, ids, attempts, e)
+    if channel is None:
+        print(f"Outbox: channel {channel_id} not found, dropping {len(ids)} notification(s).")
+        return await delete_notifications(ids)
+
+    # (row ids, text) per message, so delivered chunks can be deleted one by one
+    chunks = [([], "")]
+    for row in rows:
+        if len(chunks[-1][1]) + len(row[2]) + 1 > 2000:
+            chunks.append(([], ""))
+        chunk_ids, text = chunks[-1]
+        chunk_ids.append(row[0])
+        chunks[-1] = (chunk_ids, f"{text}\n{row[2]}" if text else row[2])
+
+    for index, (chunk_ids, text) in enumerate(chunks):
+        # Only undelivered chunks are dropped or retried, so nobody gets a receipt twice
+        pending = [row_id for later_ids, _ in chunks[index:] for row_id in later_ids]
+        try:
+            await channel.send(text)
+        except interactions.errors.Forbidden:
+            print(f"Outbox: no access to channel {channel_id}, dropping {len(pending)} notification(s).")
+            return await delete_notifications(pending)
+        except OUTBOX_RETRY_ERRORS as e:
+            return await retry_or_drop_notifications(channel_id, pending, attempts, e)
+        await delete_notifications(chunk_ids)
+        await asyncio.sleep(OUTBOX_SEND_INTERVAL)
+
+
+async def outbox_worker():
+    """Drains the outbox in the background; woken up whenever something is queued."""
+    while True:
+        try:
+            await asyncio.wait_for(outbox_wakeup.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+        outbox_wakeup.clear()
+
+        try:
+            rows = await get_due_notifications()
+            by_channel = {}
+            for row in rows:
+                by_channel.setdefault(row[1], []).append(row)
+            for channel_id, channel_rows in by_channel.items():
+                await deliver_notifications(channel_id, channel_rows)
+            if len(rows) == OUTBOX_BATCH_SIZE:
+                outbox_wakeup.set()
+        except Exception as e:
+            print(f"Outbox worker error: {e}")
+
+
+# ============================================================
+#                   TASK / JOB LIFECYCLE SWEEPER
+# ============================================================
+
+def claim_button(kind: str, status: str = "open"):
+    """The claim button of a task or job message, disabled once it is no longer open."""
+    if status == "open":
+        label = f"Claim {kind}"
+    else:
+        label = f"{kind.capitalize()} {status}"
+    return Button(
+        style=ButtonStyle.PRIMARY,
+        label=label,
+        custom_id=f"claim_{kind}_button",
+        disabled=status != "open"
+    )
+
+
+async def disable_claim_button(kind: str, channel_id: int, message_id: int, status: str):
+    try:
+        await bot.http.edit_message(
+            {"components": [ActionRow(claim_button(kind, status)).to_dict()]},
+            channel_id,
+            message_id
+        )
+    except interactions.errors.HTTPException as e:
+        print(f"Sweeper: could not update {kind} message {message_id} ({e}).")
+
+
+async def sweep_items(kind: str, table: str, index: ClaimIndex, default_channel_id: int):
+    """Expires overdue items in batches, disables their buttons and archives settled ones."""
+    while rows := await expire_due_items(table):
+        for _, message_id, channel_id in rows:
+            await disable_claim_button(kind, channel_id or default_channel_id, message_id, "expired")
+            await asyncio.sleep(SWEEP_EDIT_INTERVAL)
+        if len(rows) < SWEEP_BATCH_SIZE:
+            break
+
+    while names := await archive_settled_items(table):
+        for name in names:
+            index.remove_item(name)
+        if len(names) < SWEEP_BATCH_SIZE:
+            break
+
+
+async def lifecycle_sweeper():
+    """Periodically closes expired tasks and jobs."""
+    while True:
+        try:
+            await sweep_items("task", "tasks", task_index, TASK_CHANNEL_ID)
+            await sweep_items("job", "jobs", job_index, JOB_CHANNEL_ID)
+        except Exception as e:
+            print(f"Lifecycle sweeper error: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def salary_scheduler():
+    """Pays job salaries as they fall due; woken up when someone is hired."""
+    while True:
+        try:
+            paid = await pay_due_salaries()
+            if paid:
+                print(f"Paid {paid} salaries.")
+        except Exception as e:
+            print(f"Salary scheduler error: {e}")
+        try:
+            await asyncio.wait_for(salary_wakeup.wait(), timeout=SALARY_CHECK_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        salary_wakeup.clear()
+
+
+async def get_tax_settings():
+    """Tax rate (basis points), exempt threshold and interval (seconds, 0 = off) from meta."""
+    return (
+        int(await get_meta("tax_rate_bp") or 0),
+        int(await get_meta("tax_threshold") or 0),
+        int(await get_meta("tax_interval") or 0),
+    )
+
+
+async def tax_scheduler():
+    """Runs the tax sweep every tax_interval, counting from the last sweep."""
+    while True:
+        try:
+            rate_bp, threshold, interval = await get_tax_settings()
+            if rate_bp <= 0 or interval <= 0:
+                await asyncio.sleep(SWEEP_INTERVAL)
+                continue
+
+            last_tax_at = int(await get_meta("last_tax_at") or 0)
+            if last_tax_at + interval > time.time():
+                await asyncio.sleep(min(SWEEP_INTERVAL, last_tax_at + interval - time.time()))
+                continue
+
+            collected = await collect_tax(rate_bp, threshold, interval)
+            if collected is None:
+                continue
+            payers, total = collected
+            print(f"Tax sweep: {total} credits from {payers} accounts.")
+        except Exception as e:
+            print(f"Tax sweep error: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+
+# ============================================================
+#                        ONLINE BACKUPS
+# ============================================================
+
+async def backup_db():
+    """Snapshot bank.db with SQLite's online backup API, a bounded number of pages per step."""
+    async with backup_lock:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        path = os.path.join(BACKUP_DIR, f"bank-{time.strftime('%Y%m%d-%H%M%S')}.db")
+        partial_path = f"{path}.partial"
+
+        # The copy runs on the source connection's worker thread, so the event loop stays free.
+        # `sleep=` only applies to BUSY/LOCKED steps; the progress callback pauses after every step
+        # and aborts the copy once it has run for BACKUP_MAX_SECONDS.
+        deadline = time.monotonic() + BACKUP_MAX_SECONDS
+
+        def pace(status, remaining, total):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"backup gave up after {BACKUP_MAX_SECONDS}s with {remaining} of {total} pages left")
+            time.sleep(BACKUP_STEP_SLEEP)
+
+        target = sqlite3.connect(partial_path, check_same_thread=False)
+        try:
+            async with aiosqlite.connect("bank.db") as db:
+                # Every helper writes through its own connection, which would restart a stepped copy
+                # after each commit. An open read transaction pins a WAL snapshot across all steps
+                # without blocking writers.
+                await db.execute("BEGIN")
+                await db.execute("SELECT COUNT(*) FROM sqlite_master")
+                try:
+                    await db.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=pace)
+                finally:
+                    await db.rollback()
+        except BaseException:
+            target.close()
+            os.remove(partial_path)
+            raise
+        target.close()
+        os.replace(partial_path, path)
+
+        snapshots = sorted(
+            name for name in os.listdir(BACKUP_DIR)
+            if name.startswith("bank-") and name.endswith(".db")
+        )
+        for name in snapshots[:-BACKUP_KEEP]:
+            os.remove(os.path.join(BACKUP_DIR, name))
+
+    await set_meta("last_backup_at", str(int(time.time())))
+    return path
+
+
+async def backup_scheduler():
+    """Takes a backup every BACKUP_INTERVAL, counting from the last one taken."""
+    while True:
+        try:
+            last_backup_at = int(await get_meta("last_backup_at") or 0)
+            await asyncio.sleep(max(0, last_backup_at + BACKUP_INTERVAL - time.time()))
+            path = await backup_db()
+            print(f"Backup written to {path}.")
+        except Exception as e:
+            print(f"Backup error: {e}")
+            await asyncio.sleep(60)
+
+
+# ============================================================
+#                        LEDGER EXPORT
+# ============================================================
+
+def write_export_rows(file, writer, rows: list):
+    if writer is not None:
+        writer.writerows(rows)
+    else:
+        file.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+
+async def export_transactions(fmt: str, discord_id: int = None, since: int = None, until: int = None):
+    """Streams the ledger into a gzipped CSV or JSONL file chunk by chunk. Returns its path and row count."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"transactions-{time.strftime('%Y%m%d-%H%M%S')}.{fmt}.gz")
+    count = 0
+
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as file:
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(file)
+            writer.writerow(EXPORT_COLUMNS)
+        async for rows in iter_transactions(discord_id, since, until):
+            # Compression happens off the event loop
+            await asyncio.to_thread(write_export_rows, file, writer, rows)
+            count += len(rows)
+
+    return path, count
+
+
+def parse_date(value: str):
+    """YYYY-MM-DD (UTC) to epoch seconds, None if empty or invalid."""
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
 # ============================================================
-#                     MOJANG API CHECK
+#                       SAMPLING PROFILER
 # ============================================================
 
-async def get_minecraft_profile(username: str):
-    """Check Mojang API for username → UUID."""
-    url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
+class SamplingProfiler:
+    """Samples the event loop and aiosqlite worker stacks from a background thread."""
+
+    def __init__(self, db_idle_frame: tuple, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.loop_thread = threading.get_ident()
+        self.db_worker_code, self.db_idle_line = db_idle_frame
+        self.stacks = Counter()     # (role, frame, ...) root first -> samples
+        self.samples = Counter()    # role -> samples, idle ones included
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+
+            if thread_id == self.loop_thread:
+                role = "event-loop"
+                # Parked in selector.select() waiting for I/O
+                idle = stack[0].f_code.co_name == "select"
+            elif any(f.f_code is self.db_worker_code for f in stack):
+                role = "aiosqlite"
+                # Blocked on the request queue; a running query shows the same frame on another line
+                idle = stack[0].f_code is self.db_worker_code and stack[0].f_lineno == self.db_idle_line
+            else:
+                continue
+
+            self.samples[role] += 1
+            if not idle:
+                self.stacks[(role, *(self.frame_label(f) for f in reversed(stack)))] += 1
+
+    @staticmethod
+    def frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def write_folded(self, path: str):
+        """One `role;outer;...;inner count` line per stack, the input format of flamegraph.pl and speedscope."""
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+    def summary(self, top: int = PROFILE_TOP):
+        """Busy share per thread role and the functions with the most self / total samples."""
+        busy = Counter()
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            busy[stack[0]] += count
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+
+        lines = [
+            f"{role}: busy in {busy[role]} of {samples} samples ({100 * busy[role] / samples:.0f}%)"
+            for role, samples in self.samples.items()
+        ]
+        lines.append("")
+        lines.append("self   total  function")
+        busy_samples = sum(busy.values()) or 1
+        for label, count in own.most_common(top):
+            lines.append(f"{100 * count / busy_samples:5.1f}% {100 * total[label] / busy_samples:5.1f}%  {label}")
+        return "\n".join(lines)
+
+
+async def aiosqlite_idle_frame():
+    """(code, line) an idle aiosqlite worker thread waits at, taken from a live connection's thread.
+
+    Found at runtime rather than by aiosqlite's private names, so it follows their internals.
+    """
+    async with aiosqlite.connect(":memory:") as db:
+        # SQL functions run on the connection's worker thread
+        await db.create_function("thread_ident", 0, threading.get_ident)
+        cursor = await db.execute("SELECT thread_ident()")
+        (thread_id,) = await cursor.fetchone()
+        await cursor.close()
+        # Give the thread time to return to its queue
+        await asyncio.sleep(0.05)
+        frame = sys._current_frames()[thread_id]
+        return frame.f_code, frame.f_lineno
+
+
+async def profile_bot(seconds: int):
+    """Profiles the running bot for `seconds`. Returns the folded stack file path and a text summary."""
+    profiler = SamplingProfiler(await aiosqlite_idle_frame())
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await asyncio.to_thread(profiler.stop)
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+    await asyncio.to_thread(profiler.write_folded, path)
+    return path, profiler.summary()
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
 
-            if response.status == 200:
-                data = await response.json()
-                return {
-                    "exists": True,
-                    "uuid": data["id"],
-                    "username": data["name"]
-                }
+# ============================================================
+#                     MINECRAFT BRIDGE API
+# ============================================================
 
-            elif response.status in (204, 404):
-                return {"exists": False, "uuid": None, "username": None}
+@web.middleware
+async def bridge_auth(request: web.Request, handler):
+    """Every bridge endpoint needs `Authorization: Bearer <BRIDGE_TOKEN>`."""
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {BRIDGE_TOKEN}"):
+        return web.json_response({"error": "unauthorized"}, status=401)
+    try:
+        return await handler(request)
+    except (KeyError, TypeError, ValueError):
+        return web.json_response({"error": "invalid request"}, status=400)
+
+
+def bridge_uuid(value) -> str:
+    """32 hex digits, dashed or not, as undashed lowercase hex. Raises ValueError (→ 400) otherwise."""
+    hex_uuid = value.replace("-", "").lower() if isinstance(value, str) else ""
+    if len(hex_uuid) != 32 or any(c not in "0123456789abcdef" for c in hex_uuid):
+        raise ValueError(f"invalid uuid: {value!r}")
+    return hex_uuid
+
+
+def bridge_amount(value) -> int:
+    # bool is an int subclass; floats would be silently truncated
+    if type(value) is not int:
+        raise ValueError(f"invalid amount: {value!r}")
+    return value
+
+
+async def bridge_balance(request: web.Request):
+    """GET /balance/{uuid}"""
+    minecraft_uuid = bridge_uuid(request.match_info["uuid"])
+    balances = await get_balances_by_uuid([minecraft_uuid])
+    if not balances:
+        return web.json_response({"error": "unknown player"}, status=404)
+    return web.json_response({"uuid": minecraft_uuid, "balance": next(iter(balances.values()))})
+
+
+async def bridge_balances(request: web.Request):
+    """POST /balances {"uuids": [...]} → balances of every linked player, null for unknown ones."""
+    uuids = [bridge_uuid(u) for u in (await request.json())["uuids"]]
+    if len(uuids) > BRIDGE_MAX_BATCH:
+        return web.json_response({"error": f"at most {BRIDGE_MAX_BATCH} uuids"}, status=400)
+    balances = await get_balances_by_uuid(uuids)
+    return web.json_response({"balances": {u: balances.get(u) for u in uuids}})
+
+
+async def bridge_pay(request: web.Request):
+    """POST /pay {"from": uuid, "to": uuid, "amount": int}"""
+    body = await request.json()
+    amount = bridge_amount(body["amount"])
+    sender_db = await get_user(minecraft_uuid=bridge_uuid(body["from"]))
+    recipient_db = await get_user(minecraft_uuid=bridge_uuid(body["to"]))
+    if sender_db is None or recipient_db is None:
+        return web.json_response({"error": "unknown player"}, status=404)
+
+    async with locks.hold(sender_db.discord_id):
+        error = await pay(sender_db.discord_id, recipient_db, amount)
+    if error is not None:
+        return web.json_response({"error": error}, status=400)
+    return web.json_response({"ok": True, "balance": await get_balance(sender_db.discord_id)})
+
+
+async def start_bridge():
+    """Serves the bridge API for the Minecraft server plugin on BRIDGE_HOST:BRIDGE_PORT."""
+    global bridge_runner
+    app = web.Application(middlewares=[bridge_auth])
+    app.add_routes([
+        web.get("/balance/{uuid}", bridge_balance),
+        web.post("/balances", bridge_balances),
+        web.post("/pay", bridge_pay),
+    ])
+    bridge_runner = web.AppRunner(app)
+    await bridge_runner.setup()
+    await web.TCPSite(bridge_runner, BRIDGE_HOST, BRIDGE_PORT).start()
+    print(f"Bridge API listening on {BRIDGE_HOST}:{BRIDGE_PORT}.")
 
-            return {
-                "exists": False,
-                "uuid": None,
-                "username": None,
-                "error": f"Mojang API error {response.status}"
-            }
+
+# ============================================================
+#                  HTTP INTERACTIONS ENDPOINT
+# ============================================================
+
+async def refresh_caches(markers: dict):
+    """Reloads only the caches whose tables changed since `markers`. Returns the new markers."""
+    current = await get_cache_markers()
+    if current["users"] != markers["users"]:
+        # Users are only ever added, so the new rows are enough
+        await load_player_index(player_index, player_trigrams, after_id=markers["users"])
+    if current.get("config_version") != markers.get("config_version"):
+        await load_config()
+    if current.get("admin_sessions_version") != markers.get("admin_sessions_version"):
+        await load_admin_sessions()
+    for table, index in (("tasks", task_index), ("jobs", job_index)):
+        if current.get(f"{table}_version") != markers.get(f"{table}_version"):
+            # Open items are few, rebuilding their index is cheap
+            fresh = ClaimIndex()
+            await load_claim_index(table, fresh)
+            index.names, index.claimers = fresh.names, fresh.claimers
+    return current
+
+
+async def cache_refresher(markers: dict):
+    """Applies writes made by other processes to the in-memory caches."""
+    async with aiosqlite.connect("bank.db") as db:
+        last_version = None
+        while True:
+            # data_version moves for commits made through other connections, i.e. every write
+            cursor = await db.execute("PRAGMA data_version")
+            (version,) = await cursor.fetchone()
+            if last_version is not None and version != last_version:
+                try:
+                    markers = await refresh_caches(markers)
+                except Exception as e:
+                    print(f"Cache refresh failed: {e}")
+            last_version = version
+            await asyncio.sleep(CACHE_REFRESH_INTERVAL)
+
+
+async def cache_guild(guild_id):
+    """Interaction contexts read the guild and its channels from the cache, which no gateway fills here."""
+    if guild_id is None or bot.cache.get_guild(guild_id) is not None:
+        return
+    guild = await bot.fetch_guild(guild_id)
+    await guild.fetch_channels()
+
+
+def interactions_app(verify_key):
+    async def handle_interaction(request: web.Request):
+        """POST / from Discord: verify the Ed25519 signature, then dispatch like a gateway event."""
+        body = await request.read()
+        try:
+            verify_key.verify(
+                request.headers["X-Signature-Timestamp"].encode() + body,
+                bytes.fromhex(request.headers["X-Signature-Ed25519"])
+            )
+        except (KeyError, ValueError, BadSignatureError):
+            return web.Response(status=401, text="invalid request signature")
+
+        data = json.loads(body)
+        if data["type"] == interactions.InteractionType.PING:
+            return web.json_response({"type": interactions.CallbackType.PONG})
+
+        await cache_guild(data.get("guild_id"))
+        # Handlers answer through the interaction callback endpoint, like they do over the gateway
+        asyncio.create_task(bot.processors["raw_interaction_create"](
+            interactions.events.RawGatewayEvent(data, override_name="raw_interaction_create")
+        ))
+        bot.dispatch(interactions.events.RawGatewayEvent(data, override_name="raw_interaction_create"))
+        return web.Response(status=202)
+
+    app = web.Application()
+    app.router.add_post("/", handle_interaction)
+    return app
+
+
+async def serve_interactions(worker: int):
+    """One HTTP worker process. The kernel spreads connections over all workers sharing the port."""
+    markers = await load_caches()
+    await bot.login()
+    # Private client internals, checked against discord-py-interactions 5.16 (pinned in requirements.txt):
+    # cache the remote command IDs and mark startup done, as the gateway READY handler would
+    await bot._init_interactions()
+    bot._startup = True
+    start_recording()
+
+    runner = web.AppRunner(interactions_app(VerifyKey(bytes.fromhex(INTERACTIONS_PUBLIC_KEY))))
+    await runner.setup()
+    await web.TCPSite(runner, INTERACTIONS_HOST, INTERACTIONS_PORT, reuse_port=True).start()
+    print(f"Interactions worker {worker} listening on {INTERACTIONS_HOST}:{INTERACTIONS_PORT}.")
+    await cache_refresher(markers)
+
+
+def run_interactions_worker(worker: int):
+    asyncio.run(serve_interactions(worker))
+
+
+async def start_interaction_workers():
+    """Spawns the HTTP workers once the database has been migrated by this process."""
+    if VerifyKey is None or not INTERACTIONS_PUBLIC_KEY:
+        raise RuntimeError("INTERACTIONS_WORKERS needs PyNaCl installed and DISCORD_PUBLIC_KEY set.")
+    global cache_task
+    markers = await startup_task
+    context = multiprocessing.get_context("spawn")
+    for worker in range(INTERACTIONS_WORKERS):
+        process = context.Process(target=run_interactions_worker, args=(worker,), daemon=True)
+        process.start()
+        interaction_workers.append(process)
+    # Set-money sessions are started by the workers but answered here
+    cache_task = asyncio.create_task(cache_refresher(markers))
 
 
 # ============================================================
 #                   ON READY & CONSTANTS
 # ============================================================
 
+def command_schema_hash():
+    """Hash of every registered application command, as it would be sent to Discord."""
+    schema = application_commands_to_dict(bot.interactions_by_scope, bot)
+    payload = json.dumps(
+        {str(scope): cmds for scope, cmds in schema.items()},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def sync_commands_if_changed():
+    """Sync slash commands only when their schema differs from the last synced one."""
+    schema_hash = command_schema_hash()
+    if await get_meta("command_hash") == schema_hash:
+        print("Commands unchanged, skipping sync.")
+        return
+    await bot.synchronise_interactions()
+    await set_meta("command_hash", schema_hash)
+    print("Commands synced.")
+
+
+async def load_caches():
+    """Load the config and name indexes. Returns the change markers they were loaded at."""
+    markers = await get_cache_markers()
+    await asyncio.gather(
+        load_config(),
+        load_claim_index("tasks", task_index),
+        load_claim_index("jobs", job_index),
+        load_player_index(player_index, player_trigrams),
+        load_admin_sessions()
+    )
+    return markers
+
+
+async def warm_up():
+    """Prepare the database, config and caches before the first interaction. Returns the cache markers."""
+    await init_db()
+    return await load_caches()
+
+
 @bot.event()
 async def on_ready():
-    await bot.synchronise_interactions()
+    global outbox_task, sweeper_task, backup_task, salary_task, tax_task
+    # The background workers start even if warm-up or the command sync failed
+    try:
+        await startup_task
+    except Exception as e:
+        print(f"Startup error: {e}")
+    try:
+        await sync_commands_if_changed()
+    except Exception as e:
+        print(f"Command sync failed: {e}")
+    if outbox_task is None:
+        outbox_task = asyncio.create_task(outbox_worker())
+    if sweeper_task is None:
+        sweeper_task = asyncio.create_task(lifecycle_sweeper())
+    if backup_task is None:
+        backup_task = asyncio.create_task(backup_scheduler())
+    if salary_task is None:
+        salary_task = asyncio.create_task(salary_scheduler())
+    if tax_task is None:
+        tax_task = asyncio.create_task(tax_scheduler())
+    if bridge_runner is None and BRIDGE_TOKEN:
+        await start_bridge()
     print("Bot online!")
     for guild in bot.guilds:
         print(f"Connected to guild: {guild.name} (ID: {guild.id})")
@@ -368,6 +2009,8 @@ async def link(ctx: interactions.SlashContext):
 
 
 @modal_callback("link_modal")
+@throttled
+@account_locked
 async def handle_modal(ctx: interactions.ModalContext):
     """Handles Minecraft ↔ Discord linking."""
     minecraft_username = ctx.responses["minecraft_username"].lower()
@@ -395,7 +2038,8 @@ async def handle_modal(ctx: interactions.ModalContext):
         return await ctx.send("❌ UUID already linked to someone.", ephemeral=True)
 
     # Success
-    await register_user_db(discord_id, discord_user, minecraft_username, minecraft_uuid)
+    if not await register_user_db(discord_id, discord_user, minecraft_username, minecraft_uuid):
+        return await ctx.send("❌ This account was linked in the meantime.", ephemeral=True)
     await ctx.send("✅ Minecraft account linked successfully!", ephemeral=True)
 
 
@@ -404,6 +2048,8 @@ async def handle_modal(ctx: interactions.ModalContext):
 # ============================================================
 
 @interactions.component_callback("create_bank_button")
+@throttled
+@account_locked
 async def create_bank_button_clicked(ctx: interactions.ComponentContext):
     """Creates a private bank channel for the user."""
     server = ctx.guild
@@ -419,39 +2065,47 @@ async def create_bank_button_clicked(ctx: interactions.ComponentContext):
     if user_db is None:
         return await ctx.send("Link your account first using /link.", ephemeral=True)
 
-    if user_db[6] == 1:
-        return await ctx.send(f"You already have a bank: <#{user_db[7]}>", ephemeral=True)
+    # The account lock only covers this process; the conditional update also guards other workers
+    if user_db.has_bank == 1 or not await reserve_bank(user.id):
+        user_db = await get_user(discord_id=user.id)
+        if user_db.bank_channel_id is None:
+            return await ctx.send("Your bank is being created.", ephemeral=True)
+        return await ctx.send(f"You already have a bank: <#{user_db.bank_channel_id}>", ephemeral=True)
 
     # Create private bank channel
-    channel = await server.create_text_channel(
-        name=f"{user.username}-bank",
-        category=category,
-        permission_overwrites=[
-            interactions.PermissionOverwrite(
-                id=server.default_role.id,
-                type=interactions.OverwriteType.ROLE,
-                deny=interactions.Permissions.VIEW_CHANNEL,
-            ),
-            interactions.PermissionOverwrite(
-                id=user.id,
-                type=interactions.OverwriteType.MEMBER,
-                allow=(
-                    interactions.Permissions.VIEW_CHANNEL
-                    | interactions.Permissions.SEND_MESSAGES
-                    | interactions.Permissions.READ_MESSAGE_HISTORY
+    try:
+        channel = await server.create_text_channel(
+            name=f"{user.username}-bank",
+            category=category,
+            permission_overwrites=[
+                interactions.PermissionOverwrite(
+                    id=server.default_role.id,
+                    type=interactions.OverwriteType.ROLE,
+                    deny=interactions.Permissions.VIEW_CHANNEL,
                 ),
-            ),
-            interactions.PermissionOverwrite(
-                id=BOT_ID,
-                type=interactions.OverwriteType.MEMBER,
-                allow=(
-                    interactions.Permissions.VIEW_CHANNEL
-                    | interactions.Permissions.SEND_MESSAGES
-                    | interactions.Permissions.READ_MESSAGE_HISTORY
+                interactions.PermissionOverwrite(
+                    id=user.id,
+                    type=interactions.OverwriteType.MEMBER,
+                    allow=(
+                        interactions.Permissions.VIEW_CHANNEL
+                        | interactions.Permissions.SEND_MESSAGES
+                        | interactions.Permissions.READ_MESSAGE_HISTORY
+                    ),
                 ),
-            ),
-        ],
-    )
+                interactions.PermissionOverwrite(
+                    id=BOT_ID,
+                    type=interactions.OverwriteType.MEMBER,
+                    allow=(
+                        interactions.Permissions.VIEW_CHANNEL
+                        | interactions.Permissions.SEND_MESSAGES
+                        | interactions.Permissions.READ_MESSAGE_HISTORY
+                    ),
+                ),
+            ],
+        )
+    except Exception:
+        await release_bank(user.id)
+        raise
     await update_user_bank(user.id, channel.id)
 
     await ctx.send(f"Bank created! <#{channel.id}>", ephemeral=True)
@@ -472,12 +2126,13 @@ async def create_bank_button_clicked(ctx: interactions.ComponentContext):
 # ============================================================
 
 @interactions.component_callback("bank_balance")
+@throttled
 async def bank_balance_clicked(ctx: interactions.ComponentContext):
-    user_db = await get_user(discord_id=ctx.user.id)
-    if user_db is None:
+    balance = await get_balance(ctx.user.id)
+    if balance is None:
         return await ctx.send("Error: Contact admin.", ephemeral=True)
 
-    await ctx.send(f"💰 Balance: **{user_db[5]}** social credits.", ephemeral=True)
+    await ctx.send(f"💰 Balance: **{balance}** social credits.", ephemeral=True)
 
 
 # ============================================================
@@ -485,6 +2140,7 @@ async def bank_balance_clicked(ctx: interactions.ComponentContext):
 # ============================================================
 
 @interactions.component_callback("bank_send_money")
+@throttled
 async def bank_send_money(ctx: interactions.SlashContext):
     """Shows a modal to send money."""
     modal = Modal(
@@ -496,44 +2152,110 @@ async def bank_send_money(ctx: interactions.SlashContext):
     await ctx.send_modal(modal)
 
 
+async def pay(sender_discord_id: int, recipient_db: AccountRecord, amount: int):
+    """Transfer path shared by Discord and the Minecraft bridge. Returns an error message, None on success."""
+    if amount <= 0:
+        return "Invalid amount."
+
+    if recipient_db.discord_id == sender_discord_id:
+        return "You cannot send money to yourself."
+
+    if recipient_db.bank_channel_id is None:
+        return "Recipient has no bank account."
+
+    # Transfer money, the recipient is notified by the outbox worker
+    sent = await transfer_money(
+        sender_discord_id,
+        recipient_db.discord_id,
+        amount,
+        recipient_db.bank_channel_id,
+        f"💸 You received **{amount}** social credits from <@{sender_discord_id}>."
+    )
+    if not sent:
+        return "Insufficient balance."
+    return None
+
+
 @modal_callback("send_money_modal")
+@throttled
+@account_locked
 async def handle_send_money_modal(ctx: interactions.ModalContext):
     """Handles money transfer logic."""
     minecraft_username = ctx.responses["username_recipient"].lower()
     amount = int(ctx.responses["amount"])
 
-    sender_db = await get_user(discord_id=ctx.author.id)
+    sender_balance = await get_balance(ctx.author.id)
     recipient_db = await get_minecraft_username(minecraft_username)
 
     # Error cases
-    if recipient_db is None:
-        return await ctx.send("❌ Unknown Minecraft username.", ephemeral=True)
+    if sender_balance is None:
+        return await ctx.send("❌ Link your account first using /link.", ephemeral=True)
 
-    if amount <= 0:
-        return await ctx.send("❌ Invalid amount.", ephemeral=True)
+    if recipient_db is None:
+        return await ctx.send(f"❌ Unknown Minecraft username.{did_you_mean(minecraft_username)}", ephemeral=True)
 
-    if sender_db[5] < amount:
+    if sender_balance < amount:
         return await ctx.send("❌ Insufficient balance.", ephemeral=True)
 
-    if recipient_db[1] == ctx.author.id:
-        return await ctx.send("❌ You cannot send money to yourself.", ephemeral=True)
+    error = await pay(ctx.author.id, recipient_db, amount)
+    if error is not None:
+        return await ctx.send(f"❌ {error}", ephemeral=True)
 
-    if recipient_db[7] is None:
-        return await ctx.send("❌ Recipient has no bank account.", ephemeral=True)
+    await ctx.send(f"✅ Sent {amount} credits to <@{recipient_db.discord_id}>.", ephemeral=True)
 
-    # Transfer money
-    await update_user_balance(ctx.author.id, sender_db[5] - amount)
-    await update_user_balance(recipient_db[1], recipient_db[5] + amount)
-    await log_transaction(ctx.author.id, recipient_db[1], 0, 0, amount)
 
-    # Notify sender
-    await ctx.send(f"✅ Sent {amount} credits to <@{recipient_db[1]}>.", ephemeral=True)
+async def find_recipient(value: str):
+    """Account for a Discord mention or ID, or else a linked Minecraft username."""
+    value = value.strip()
+    discord_id = value.removeprefix("<@").removeprefix("!").removesuffix(">")
+    # Minecraft names are at most 16 characters, Discord IDs at least 17 digits
+    if discord_id.isdigit() and len(discord_id) > 16:
+        return await get_user(discord_id=int(discord_id))
+    return await get_minecraft_username(value.lower())
 
-    # Notify recipient
-    recipient_channel = bot.get_channel(recipient_db[7])
-    await recipient_channel.send(
-        f"💸 You received **{amount}** social credits from <@{ctx.author.id}>."
-    )
+
+@interactions.slash_command(
+    name="pay",
+    description="Send money to another player"
+)
+@interactions.slash_option(
+    name="user",
+    description="Minecraft username or Discord mention",
+    opt_type=interactions.OptionType.STRING,
+    required=True,
+    autocomplete=True
+)
+@interactions.slash_option(
+    name="amount",
+    description="Credits to send",
+    opt_type=interactions.OptionType.INTEGER,
+    required=True,
+    min_value=1
+)
+@throttled
+@account_locked
+async def pay_command(ctx: interactions.SlashContext, user: str, amount: int):
+    """Sends money in a single interaction."""
+    sender_db = await get_user(discord_id=ctx.author.id)
+    if sender_db is None:
+        return await ctx.send("❌ Link your account first using /link.", ephemeral=True)
+    if sender_db.has_bank == 0:
+        return await ctx.send("❌ You need a bank account to send money.", ephemeral=True)
+
+    recipient_db = await find_recipient(user)
+    if recipient_db is None:
+        return await ctx.send(f"❌ Unknown Minecraft username.{did_you_mean(user)}", ephemeral=True)
+
+    error = await pay(ctx.author.id, recipient_db, amount)
+    if error is not None:
+        return await ctx.send(f"❌ {error}", ephemeral=True)
+
+    await ctx.send(f"✅ Sent {amount} credits to <@{recipient_db.discord_id}>.", ephemeral=True)
+
+@pay_command.autocomplete("user")
+async def pay_user_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests linked Minecraft usernames, served from memory."""
+    await ctx.send(choices=player_index.search(ctx.input_text))
 
 
 # ============================================================
@@ -555,7 +2277,7 @@ async def minecraft_name(ctx: interactions.SlashContext, user: interactions.User
     if user_db is None:
         return await ctx.send("User not found.", ephemeral=True)
 
-    profile = await get_minecraft_profile(user_db[3])
+    profile = await get_minecraft_profile(user_db.minecraft_username)
     await ctx.send(f"Minecraft username: **{profile['username']}**", ephemeral=True)
 
 
@@ -572,9 +2294,9 @@ async def minecraft_name(ctx: interactions.SlashContext, user: interactions.User
 async def discord_name(ctx: interactions.SlashContext, minecraft_username: str):
     user_db = await get_minecraft_username(minecraft_username.lower())
     if user_db is None:
-        return await ctx.send("User not found.", ephemeral=True)
+        return await ctx.send(f"User not found.{did_you_mean(minecraft_username)}", ephemeral=True)
 
-    await ctx.send(f"Discord user: <@{user_db[1]}>", ephemeral=True)
+    await ctx.send(f"Discord user: <@{user_db.discord_id}>", ephemeral=True)
 
 
 # ===========================================================
@@ -612,7 +2334,21 @@ async def task(ctx: interactions.SlashContext):
     opt_type=interactions.OptionType.INTEGER,
     required=True
 )
-async def task_create(ctx: interactions.SlashContext, name: str, description: str, reward: int):
+@interactions.slash_option(
+    name="duration_hours",
+    description="Hours before the task expires",
+    opt_type=interactions.OptionType.INTEGER,
+    required=False,
+    min_value=1
+)
+@interactions.slash_option(
+    name="max_claimers",
+    description="Number of claims before the task closes",
+    opt_type=interactions.OptionType.INTEGER,
+    required=False,
+    min_value=1
+)
+async def task_create(ctx: interactions.SlashContext, name: str, description: str, reward: int, duration_hours: int = None, max_claimers: int = None):
     """"Creates a new task and posts it in the task channel."""
 
     embed = interactions.Embed(
@@ -623,49 +2359,66 @@ async def task_create(ctx: interactions.SlashContext, name: str, description: st
         ),
         color=0xFF5500
     )
-    
-    button = interactions.Button(
-        style=interactions.ButtonStyle.PRIMARY,
-        label="Claim task",
-        custom_id="claim_task_button"
-    )
 
-    channel = await ctx.client.fetch_channel(TASK_CHANNEL_ID)
-    message = await channel.send(
-        embeds=embed,
-        components=button
-    )
+    expires_at = None
+    if duration_hours is not None:
+        expires_at = int(time.time()) + duration_hours * 3600
+        embed.add_field(name="⏳ Expires", value=f"<t:{expires_at}:R>")
+    if max_claimers is not None:
+        embed.add_field(name="👥 Claims", value=f"{max_claimers} max")
+
+    # Names identify tasks in /task accept and its autocomplete, so they must stay unique until archived
+    async with locks.hold(("task-name", name.lower())):
+        if await item_name_taken("tasks", name):
+            return await ctx.send(f"❌ A task named **{name}** already exists.", ephemeral=True)
+
+        channel = await ctx.client.fetch_channel(TASK_CHANNEL_ID)
+        message = await channel.send(
+            embeds=embed,
+            components=claim_button("task")
+        )
 
-    await create_task(message.id, name, description, reward, ctx.author.id)
+        await create_task(message.id, name, description, reward, ctx.author.id, channel.id, expires_at, max_claimers)
+    task_index.add_item(name)
     await ctx.send("Task created successfully.", ephemeral=True)
 
 @interactions.component_callback("claim_task_button")
+@throttled
+@account_locked
 async def claim_task_callback(ctx: interactions.ComponentContext):
     """Triggered when someone claims the task."""
 
     author_db = await get_user(discord_id=ctx.author.id)
     if author_db is None:
         return await ctx.send("❌ Link your account first using /link.", ephemeral=True)
-    if author_db[6] == 0:
+    if author_db.has_bank == 0:
         return await ctx.send("❌ You need a bank account to claim tasks.", ephemeral=True)
     
-    task_db = await get_task(ctx.message.id)
-    if task_db is None:
-        return await ctx.send("❌ Task not found.", ephemeral=True)
-
-    raw_claimed_by = task_db[6]
-    if raw_claimed_by:
-        claimed_by = json.loads(raw_claimed_by)
-    else:
-        claimed_by = {}
-    if str(ctx.author.id) in claimed_by:
-            return await ctx.send("❌ You have already claimed this task.", ephemeral=True)
+    async with locks.hold(("task", ctx.message.id)):
+        task_db = await get_task(ctx.message.id)
+        if task_db is None:
+            return await ctx.send("❌ Task not found.", ephemeral=True)
+        if task_db.status != "open" or (task_db.expires_at is not None and task_db.expires_at <= time.time()):
+            return await ctx.send("❌ This task is no longer open.", ephemeral=True)
+
+        raw_claimed_by = task_db.claimed_by_discord_ids
+        if raw_claimed_by:
+            claimed_by = json.loads(raw_claimed_by)
+        else:
+            claimed_by = {}
+        if str(ctx.author.id) in claimed_by:
+                return await ctx.send("❌ You have already claimed this task.", ephemeral=True)
 
-    claimed_by[str(ctx.author.id)] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    await change_task_claimed_by(ctx.message.id, json.dumps(claimed_by))
+        claimed_by[str(ctx.author.id)] = int(time.time())
+        status = await claim_task(ctx.message.id, json.dumps(claimed_by), raw_claimed_by)
+        if status is None:
+            return await ctx.send("❌ Someone claimed this task at the same time, please try again.", ephemeral=True)
+        task_index.add_claimer(task_db.name, author_db.minecraft_username)
+        if status != "open":
+            await ctx.message.edit(components=claim_button("task", status))
 
-    minecraft_username = (await get_minecraft_profile(author_db[3]))['username']
-    await bot.get_channel(TASK_ADMIN_CHHANNEL_ID).send(f"📝 The task **{task_db[2]}** has been claimed by {ctx.author.mention} ({minecraft_username})")
+    minecraft_username = (await get_minecraft_profile(author_db.minecraft_username))['username']
+    await bot.get_channel(TASK_ADMIN_CHANNEL_ID).send(f"📝 The task **{task_db.name}** has been claimed by {ctx.author.mention} ({minecraft_username})")
 
     await ctx.send("✅ You claimed the task!", ephemeral=True)
 
@@ -677,40 +2430,91 @@ async def claim_task_callback(ctx: interactions.ComponentContext):
     name="task",
     description="Task name",
     opt_type=interactions.OptionType.STRING,
-    required=True
+    required=True,
+    autocomplete=True
 )
 @interactions.slash_option(
     name="claimer",
     description="Minecraft username who claimed the task",
     opt_type=interactions.OptionType.STRING,
-    required=True
+    required=True,
+    autocomplete=True
 )
-async def job_accept(ctx: interactions.SlashContext, task: str, claimer: str):
+async def task_accept(ctx: interactions.SlashContext, task: str, claimer: str):
     """Accepts a claimed task."""
-    
-    task_db = await get_task_from_name(task)
-    if task_db is None:
-        return await ctx.send("❌ Task not found.", ephemeral=True)
-    
+
     claimer_db = await get_user(minecraft_username=claimer.lower())
     if claimer_db is None:
         return await ctx.send("❌ Claimer not found.", ephemeral=True)
-    if claimer_db[6] == 0:
+    if claimer_db.has_bank == 0:
         return await ctx.send("❌ Claimer has no bank account.", ephemeral=True)
-    
-    raw_claimed_by = task_db[6]
-    if raw_claimed_by:
-        claimed_by = json.loads(raw_claimed_by)
-    else:
-        claimed_by = {}
-    if str(claimer_db[1]) not in claimed_by:
-        return await ctx.send("❌ This task was not claimed by that user.", ephemeral=True)
 
-    reward = task_db[4]
-    claimer_balance = claimer_db[5]
-    await update_user_balance(claimer_db[1], claimer_balance + reward)
-    await log_transaction(0, claimer_db[1], 0, 1, reward)
-    await ctx.send(f"✅ Task accepted. {reward} credits sent to {claimer_db[2]}.", ephemeral=True)
+    task_db = await get_task_from_name(task)
+    if task_db is None:
+        return await ctx.send("❌ Task not found.", ephemeral=True)
+
+    async with locks.hold(claimer_db.discord_id):
+        async with locks.hold(("task", task_db.message_id)):
+            # Re-read under the locks so a concurrent accept can't pay the same claim twice
+            task_db = await get_task(task_db.message_id)
+            if task_db is None:
+                return await ctx.send("❌ Task not found.", ephemeral=True)
+            raw_claimed_by = task_db.claimed_by_discord_ids
+            if raw_claimed_by:
+                claimed_by = json.loads(raw_claimed_by)
+            else:
+                claimed_by = {}
+            if str(claimer_db.discord_id) not in claimed_by:
+                return await ctx.send("❌ This task was not claimed by that user.", ephemeral=True)
+
+            # The claim is settled by accepting it
+            del claimed_by[str(claimer_db.discord_id)]
+            if not await change_task_claimed_by(task_db.message_id, json.dumps(claimed_by), raw_claimed_by):
+                return await ctx.send("❌ The claims on this task just changed, please try again.", ephemeral=True)
+            task_index.remove_claimer(task_db.name, claimer_db.minecraft_username)
+
+            reward = task_db.reward
+            await reward_user(claimer_db.discord_id, reward, 1, 0)
+
+    await ctx.send(f"✅ Task accepted. {reward} credits sent to {claimer_db.discord_username}.", ephemeral=True)
+
+@task_accept.autocomplete("task")
+async def task_accept_task_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests open tasks, served from memory."""
+    await ctx.send(choices=task_index.names.search(ctx.input_text))
+
+@task_accept.autocomplete("claimer")
+async def task_accept_claimer_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests the current claimers of the chosen task, served from memory."""
+    await ctx.send(choices=task_index.search_claimers(ctx.kwargs.get("task", ""), ctx.input_text))
+
+@task.subcommand(
+    sub_cmd_name="close",
+    sub_cmd_description="Close a task so it can no longer be claimed"
+)
+@interactions.slash_option(
+    name="task",
+    description="Task name",
+    opt_type=interactions.OptionType.STRING,
+    required=True,
+    autocomplete=True
+)
+async def task_close(ctx: interactions.SlashContext, task: str):
+    """Closes a task; pending claims can still be accepted."""
+    task_db = await get_task_from_name(task)
+    if task_db is None:
+        return await ctx.send("❌ Task not found.", ephemeral=True)
+    if task_db.status != "open":
+        return await ctx.send(f"❌ This task is already {task_db.status}.", ephemeral=True)
+
+    await set_item_status("tasks", task_db.message_id, "closed")
+    await disable_claim_button("task", task_db.channel_id or TASK_CHANNEL_ID, task_db.message_id, "closed")
+    await ctx.send(f"✅ Task **{task_db.name}** closed.", ephemeral=True)
+
+@task_close.autocomplete("task")
+async def task_close_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests tasks, served from memory."""
+    await ctx.send(choices=task_index.names.search(ctx.input_text))
 
     
 # ============================================================
@@ -748,60 +2552,98 @@ async def job(ctx: interactions.SlashContext):
     opt_type=interactions.OptionType.INTEGER,
     required=True
 )
-async def job_create(ctx: interactions.SlashContext, name: str, description: str, reward: int):
-    """Creates a new job (functionality to be implemented)."""
+@interactions.slash_option(
+    name="duration_hours",
+    description="Hours before the job expires",
+    opt_type=interactions.OptionType.INTEGER,
+    required=False,
+    min_value=1
+)
+@interactions.slash_option(
+    name="max_claimers",
+    description="Number of claims before the job closes",
+    opt_type=interactions.OptionType.INTEGER,
+    required=False,
+    min_value=1
+)
+@interactions.slash_option(
+    name="pay_interval_hours",
+    description=f"Hours between two salary payments (default {SALARY_DEFAULT_INTERVAL_HOURS})",
+    opt_type=interactions.OptionType.INTEGER,
+    required=False,
+    min_value=1
+)
+async def job_create(ctx: interactions.SlashContext, name: str, description: str, reward: int, duration_hours: int = None, max_claimers: int = None, pay_interval_hours: int = SALARY_DEFAULT_INTERVAL_HOURS):
+    """Creates a new job whose holders are paid `reward` every `pay_interval_hours`."""
 
     embed = interactions.Embed(
         title=name,
         description=(
             f"## {description}\n"
-            f"### 💰 **Reward:** {reward} Social Credits"
+            f"### 💰 **Salary:** {reward} Social Credits every {pay_interval_hours}h"
         ),
         color=0xFF5500
     )
 
-    button = interactions.Button(
-        style=interactions.ButtonStyle.PRIMARY,
-        label="Claim job",
-        custom_id="claim_job_button"
-    )
-
-    channel = await ctx.client.fetch_channel(JOB_CHANNEL_ID)
-    message = await channel.send(
-        embeds=embed,
-        components=button
-    )
+    expires_at = None
+    if duration_hours is not None:
+        expires_at = int(time.time()) + duration_hours * 3600
+        embed.add_field(name="⏳ Expires", value=f"<t:{expires_at}:R>")
+    if max_claimers is not None:
+        embed.add_field(name="👥 Claims", value=f"{max_claimers} max")
+
+    # Names identify jobs in /job commands and their autocomplete, so they must stay unique until archived
+    async with locks.hold(("job-name", name.lower())):
+        if await item_name_taken("jobs", name):
+            return await ctx.send(f"❌ A job named **{name}** already exists.", ephemeral=True)
+
+        channel = await ctx.client.fetch_channel(JOB_CHANNEL_ID)
+        message = await channel.send(
+            embeds=embed,
+            components=claim_button("job")
+        )
 
-    await create_job(message.id, name, description, reward, ctx.author.id)
+        await create_job(message.id, name, description, reward, ctx.author.id, channel.id, expires_at, max_claimers, pay_interval_hours * 3600)
+    job_index.add_item(name)
     await ctx.send("Job created successfully.", ephemeral=True)
 
 @interactions.component_callback("claim_job_button")
+@throttled
+@account_locked
 async def claim_job_callback(ctx: interactions.ComponentContext):
     """Triggered when someone claims the job."""
 
     author_db = await get_user(discord_id=ctx.author.id)
     if author_db is None:
         return await ctx.send("❌ Link your account first using /link.", ephemeral=True)
-    if author_db[6] == 0:
+    if author_db.has_bank == 0:
         return await ctx.send("❌ You need a bank account to claim jobs.", ephemeral=True)
     
-    job_db = await get_job(ctx.message.id)
-    if job_db is None:
-        return await ctx.send("❌ Job not found.", ephemeral=True)
-
-    raw_claimed_by = job_db[6]
-    if raw_claimed_by:
-        claimed_by = json.loads(raw_claimed_by)
-    else:
-        claimed_by = {}
-    if str(ctx.author.id) in claimed_by:
-            return await ctx.send("❌ You have already claimed this job.", ephemeral=True)
+    async with locks.hold(("job", ctx.message.id)):
+        job_db = await get_job(ctx.message.id)
+        if job_db is None:
+            return await ctx.send("❌ Job not found.", ephemeral=True)
+        if job_db.status != "open" or (job_db.expires_at is not None and job_db.expires_at <= time.time()):
+            return await ctx.send("❌ This job is no longer open.", ephemeral=True)
+
+        raw_claimed_by = job_db.claimed_by_discord_ids
+        if raw_claimed_by:
+            claimed_by = json.loads(raw_claimed_by)
+        else:
+            claimed_by = {}
+        if str(ctx.author.id) in claimed_by:
+                return await ctx.send("❌ You have already claimed this job.", ephemeral=True)
 
-    claimed_by[str(ctx.author.id)] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    await change_job_claimed_by(ctx.message.id, json.dumps(claimed_by))
+        claimed_by[str(ctx.author.id)] = int(time.time())
+        status = await claim_job(ctx.message.id, json.dumps(claimed_by), raw_claimed_by)
+        if status is None:
+            return await ctx.send("❌ Someone claimed this job at the same time, please try again.", ephemeral=True)
+        job_index.add_claimer(job_db.name, author_db.minecraft_username)
+        if status != "open":
+            await ctx.message.edit(components=claim_button("job", status))
 
-    minecraft_username = (await get_minecraft_profile(author_db[3]))['username']
-    await bot.get_channel(JOB_ADMIN_CHANNEL_ID).send(f"📝 The job **{job_db[2]}** has been claimed by {ctx.author.mention} ({minecraft_username})")
+    minecraft_username = (await get_minecraft_profile(author_db.minecraft_username))['username']
+    await bot.get_channel(JOB_ADMIN_CHANNEL_ID).send(f"📝 The job **{job_db.name}** has been claimed by {ctx.author.mention} ({minecraft_username})")
 
     await ctx.send("✅ You claimed the job!", ephemeral=True)
 
@@ -813,40 +2655,119 @@ async def claim_job_callback(ctx: interactions.ComponentContext):
     name="job",
     description="Job name",
     opt_type=interactions.OptionType.STRING,
-    required=True
+    required=True,
+    autocomplete=True
 )
 @interactions.slash_option(
     name="claimer",
     description="Minecraft username who claimed the job",
     opt_type=interactions.OptionType.STRING,
-    required=True
+    required=True,
+    autocomplete=True
 )
 async def job_accept(ctx: interactions.SlashContext, job: str, claimer: str):
     """Accepts a claimed job."""
-    
-    job_db = await get_job_from_name(job)
-    if job_db is None:
-        return await ctx.send("❌ Job not found.", ephemeral=True)
-    
+
     claimer_db = await get_user(minecraft_username=claimer.lower())
     if claimer_db is None:
         return await ctx.send("❌ Claimer not found.", ephemeral=True)
-    if claimer_db[6] == 0:
+    if claimer_db.has_bank == 0:
         return await ctx.send("❌ Claimer has no bank account.", ephemeral=True)
-    
-    raw_claimed_by = job_db[6]
-    if raw_claimed_by:
-        claimed_by = json.loads(raw_claimed_by)
-    else:
-        claimed_by = {}
-    if str(claimer_db[1]) not in claimed_by:
-        return await ctx.send("❌ This job was not claimed by that user.", ephemeral=True)
-    
-    reward = job_db[4]
-    claimer_balance = claimer_db[5]
-    await update_user_balance(claimer_db[1], claimer_balance + reward)
-    await log_transaction(0, claimer_db[1], 0, 1, reward)
-    await ctx.send(f"✅ Job accepted. {reward} credits sent to {claimer_db[2]}.", ephemeral=True)
+
+    job_db = await get_job_from_name(job)
+    if job_db is None:
+        return await ctx.send("❌ Job not found.", ephemeral=True)
+
+    async with locks.hold(claimer_db.discord_id):
+        async with locks.hold(("job", job_db.message_id)):
+            # Re-read under the locks so a concurrent accept can't pay the same claim twice
+            job_db = await get_job(job_db.message_id)
+            if job_db is None:
+                return await ctx.send("❌ Job not found.", ephemeral=True)
+            raw_claimed_by = job_db.claimed_by_discord_ids
+            if raw_claimed_by:
+                claimed_by = json.loads(raw_claimed_by)
+            else:
+                claimed_by = {}
+            if str(claimer_db.discord_id) not in claimed_by:
+                return await ctx.send("❌ This job was not claimed by that user.", ephemeral=True)
+
+            # The claim is settled by accepting it
+            del claimed_by[str(claimer_db.discord_id)]
+            if not await change_job_claimed_by(job_db.message_id, json.dumps(claimed_by), raw_claimed_by):
+                return await ctx.send("❌ The claims on this job just changed, please try again.", ephemeral=True)
+            job_index.remove_claimer(job_db.name, claimer_db.minecraft_username)
+
+            await hire_job_holder(job_db.message_id, claimer_db.discord_id)
+
+    await ctx.send(f"✅ Job accepted. {claimer_db.discord_username} now earns {job_db.reward} credits per pay period.", ephemeral=True)
+
+@job_accept.autocomplete("job")
+async def job_accept_job_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests open jobs, served from memory."""
+    await ctx.send(choices=job_index.names.search(ctx.input_text))
+
+@job_accept.autocomplete("claimer")
+async def job_accept_claimer_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests the current claimers of the chosen job, served from memory."""
+    await ctx.send(choices=job_index.search_claimers(ctx.kwargs.get("job", ""), ctx.input_text))
+
+@job.subcommand(
+    sub_cmd_name="close",
+    sub_cmd_description="Close a job so it can no longer be claimed"
+)
+@interactions.slash_option(
+    name="job",
+    description="Job name",
+    opt_type=interactions.OptionType.STRING,
+    required=True,
+    autocomplete=True
+)
+async def job_close(ctx: interactions.SlashContext, job: str):
+    """Closes a job; pending claims can still be accepted."""
+    job_db = await get_job_from_name(job)
+    if job_db is None:
+        return await ctx.send("❌ Job not found.", ephemeral=True)
+    if job_db.status != "open":
+        return await ctx.send(f"❌ This job is already {job_db.status}.", ephemeral=True)
+
+    await set_item_status("jobs", job_db.message_id, "closed")
+    await disable_claim_button("job", job_db.channel_id or JOB_CHANNEL_ID, job_db.message_id, "closed")
+    await ctx.send(f"✅ Job **{job_db.name}** closed.", ephemeral=True)
+
+@job_close.autocomplete("job")
+async def job_close_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests jobs, served from memory."""
+    await ctx.send(choices=job_index.names.search(ctx.input_text))
+
+@job.subcommand(
+    sub_cmd_name="dismiss",
+    sub_cmd_description="Stop paying a job holder"
+)
+@interactions.slash_option(
+    name="job",
+    description="Job name",
+    opt_type=interactions.OptionType.STRING,
+    required=True,
+    autocomplete=True
+)
+@interactions.slash_option(
+    name="holder",
+    description="Minecraft username of the job holder",
+    opt_type=interactions.OptionType.STRING,
+    required=True
+)
+async def job_dismiss(ctx: interactions.SlashContext, job: str, holder: str):
+    """Ends a job holder's recurring salary."""
+    holder_db = await get_user(minecraft_username=holder.lower())
+    if holder_db is None or not await dismiss_job_holder(job, holder_db.discord_id):
+        return await ctx.send("❌ That user doesn't hold this job.", ephemeral=True)
+    await ctx.send(f"✅ {holder_db.discord_username} no longer holds **{job}**.", ephemeral=True)
+
+@job_dismiss.autocomplete("job")
+async def job_dismiss_autocomplete(ctx: interactions.AutocompleteContext):
+    """Suggests jobs, served from memory."""
+    await ctx.send(choices=job_index.names.search(ctx.input_text))
 
 
 # ============================================================
@@ -859,6 +2780,14 @@ async def job_accept(ctx: interactions.SlashContext, job: str, claimer: str):
     default_member_permissions=interactions.Permissions.ADMINISTRATOR
 )
 async def admin(ctx: interactions.SlashContext):
+    """Base command placeholder"""
+    pass
+
+@admin.subcommand(
+    sub_cmd_name="panel",
+    sub_cmd_description="Show the admin buttons"
+)
+async def admin_panel(ctx: interactions.SlashContext):
     """Shows admin buttons."""
     btn_link = Button(style=ButtonStyle.GREEN, label="Link admin", custom_id="link_admin_button")
     btn_set = Button(style=ButtonStyle.RED, label="Set money", custom_id="set_money_button")
@@ -872,6 +2801,135 @@ async def admin(ctx: interactions.SlashContext):
         ephemeral=True
     )
 
+@admin.subcommand(
+    sub_cmd_name="backup",
+    sub_cmd_description="Take a backup of the bank database now"
+)
+async def admin_backup(ctx: interactions.SlashContext):
+    """Takes an online backup without pausing the bot."""
+    await ctx.defer(ephemeral=True)
+    try:
+        path = await backup_db()
+    except Exception as e:
+        print(f"Backup error: {e}")
+        return await ctx.send(f"❌ Backup failed: {e}", ephemeral=True)
+    await ctx.send(f"✅ Backup written to `{path}`.", ephemeral=True)
+
+@admin.subcommand(
+    sub_cmd_name="export",
+    sub_cmd_description="Export the transaction ledger"
+)
+@interactions.slash_option(
+    name="format",
+    description="File format",
+    opt_type=interactions.OptionType.STRING,
+    required=True,
+    choices=[
+        interactions.SlashCommandChoice(name="CSV", value="csv"),
+        interactions.SlashCommandChoice(name="JSON Lines", value="jsonl")
+    ]
+)
+@interactions.slash_option(
+    name="user",
+    description="Only transactions sent or received by this user",
+    opt_type=interactions.OptionType.USER,
+    required=False
+)
+@interactions.slash_option(
+    name="since",
+    description="First day included (YYYY-MM-DD, UTC)",
+    opt_type=interactions.OptionType.STRING,
+    required=False
+)
+@interactions.slash_option(
+    name="until",
+    description="Last day included (YYYY-MM-DD, UTC)",
+    opt_type=interactions.OptionType.STRING,
+    required=False
+)
+async def admin_export(ctx: interactions.SlashContext, format: str, user: interactions.User = None, since: str = None, until: str = None):
+    """Streams the ledger into a compressed attachment."""
+    since_ts = parse_date(since)
+    until_ts = parse_date(until)
+    if (since and since_ts is None) or (until and until_ts is None):
+        return await ctx.send("❌ Dates must look like 2025-01-31.", ephemeral=True)
+    if until_ts is not None:
+        until_ts += 86400
+
+    await ctx.defer(ephemeral=True)
+    path, count = await export_transactions(format, user.id if user else None, since_ts, until_ts)
+
+    if os.path.getsize(path) > ctx.guild.filesize_limit:
+        return await ctx.send(f"✅ Exported {count} transactions, too large to attach: `{path}`.", ephemeral=True)
+
+    await ctx.send(
+        f"✅ Exported {count} transactions.",
+        file=interactions.File(path),
+        ephemeral=True
+    )
+    os.remove(path)
+
+
+@admin.subcommand(
+    sub_cmd_name="profile",
+    sub_cmd_description="Profile the running bot for a few seconds"
+)
+@interactions.slash_option(
+    name="seconds",
+    description="How long to sample",
+    opt_type=interactions.OptionType.INTEGER,
+    required=True,
+    min_value=1,
+    max_value=PROFILE_MAX_SECONDS
+)
+async def admin_profile(ctx: interactions.SlashContext, seconds: int):
+    """Samples the event loop and database threads, then attaches the folded stacks."""
+    if profile_lock.locked():
+        return await ctx.send("❌ A profile is already running.", ephemeral=True)
+
+    await ctx.defer(ephemeral=True)
+    async with profile_lock:
+        path, summary = await profile_bot(seconds)
+
+    text = f"✅ Profiled for {seconds}s.\n```\n{summary[:1800]}\n```"
+    if os.path.getsize(path) > ctx.guild.filesize_limit:
+        return await ctx.send(f"{text}\nFolded stacks too large to attach: `{path}`.", ephemeral=True)
+
+    await ctx.send(text, file=interactions.File(path), ephemeral=True)
+    os.remove(path)
+
+
+@admin.subcommand(
+    group_name="tax",
+    group_description="Economy-wide tax",
+    sub_cmd_name="preview",
+    sub_cmd_description="Dry run of the tax sweep with the current settings"
+)
+async def admin_tax_preview(ctx: interactions.SlashContext):
+    """Shows what the next tax sweep would collect, without changing anything."""
+    rate_bp, threshold, interval = await get_tax_settings()
+    payers, total, largest = await preview_tax(rate_bp, threshold)
+    lines = [f"<@{discord_id}>: {tax} of {money}" for discord_id, money, tax in largest]
+    await ctx.send(
+        f"🧾 Rate {rate_bp / 100}% above {threshold}, every {interval // 3600}h (0 = off).\n"
+        f"Would collect **{total}** credits from **{payers}** accounts.\n" + "\n".join(lines),
+        ephemeral=True
+    )
+
+@admin.subcommand(
+    group_name="tax",
+    group_description="Economy-wide tax",
+    sub_cmd_name="run",
+    sub_cmd_description="Run the tax sweep now"
+)
+async def admin_tax_run(ctx: interactions.SlashContext):
+    """Runs the tax sweep immediately."""
+    rate_bp, threshold, _ = await get_tax_settings()
+    if rate_bp <= 0:
+        return await ctx.send("❌ Set a tax rate first with /config set-tax.", ephemeral=True)
+    payers, total = await collect_tax(rate_bp, threshold)
+    await ctx.send(f"✅ Collected {total} credits from {payers} accounts.", ephemeral=True)
+
 
 @interactions.component_callback("create_bank_button_admin")
 async def create_bank_button_admin(ctx: interactions.ComponentContext):
@@ -896,7 +2954,8 @@ async def link_admin(ctx: interactions.ComponentContext):
     if await get_user(discord_id=ctx.author.id):
         return await ctx.send("❌ Already linked.", ephemeral=True)
 
-    await register_user_db(ctx.author.id, ctx.author.username, ctx.author.username, ctx.author.id)
+    if not await register_user_db(ctx.author.id, ctx.author.username, ctx.author.username, ctx.author.id):
+        return await ctx.send("❌ Already linked.", ephemeral=True)
     await ctx.send("✅ Linked as admin.", ephemeral=True)
 
 
@@ -904,13 +2963,12 @@ async def link_admin(ctx: interactions.ComponentContext):
 #                 SET MONEY SYSTEM (ADMIN)
 # ============================================================
 
-user_waiting_reply = {}   # {discord_id: [waiting_bool, channel_id]}
-
-
 @interactions.component_callback("set_money_button")
 async def set_money(ctx: interactions.ComponentContext):
     """Admin begins manual input process."""
-    user_waiting_reply[ctx.author.id] = [True, ctx.channel.id]
+    # Stored in the database: the button may be handled by an HTTP worker, the reply by the gateway process,
+    # whose cache refresher picks the session up within CACHE_REFRESH_INTERVAL
+    await start_admin_session(ctx.author.id, ctx.channel.id)
     await ctx.channel.send(
         "Send: `<DiscordID> <Amount>`\nType `Cancel` to stop.",
         ephemeral=True
@@ -921,28 +2979,23 @@ async def set_money(ctx: interactions.ComponentContext):
 async def on_message_create(event: interactions.events.MessageCreate):
     """Handles admin manual money input."""
     msg = event.message
-    global user_waiting_reply
 
     if msg.author.bot:
         return
 
-    # If the user is not in the waiting list → ignore
-    if not user_waiting_reply.get(msg.author.id, [False])[0]:
-        return
-
-    # Check correct channel
-    if msg.channel.id != user_waiting_reply[msg.author.id][1]:
+    # Only the channel the admin started the flow in counts
+    if admin_sessions.get(msg.author.id) != msg.channel.id:
         return
 
     # Cancel operation
     if msg.content.lower() == "cancel":
-        user_waiting_reply[msg.author.id] = [False, None]
+        await end_admin_session(msg.author.id)
         return await msg.channel.send("Operation cancelled.", ephemeral=True)
 
     # Validate format
     parts = msg.content.split(" ")
     if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
-        user_waiting_reply[msg.author.id] = [False, None]
+        await end_admin_session(msg.author.id)
         return await msg.channel.send("Invalid format. Cancelled.", ephemeral=True)
 
     target_id = int(parts[0])
@@ -951,13 +3004,14 @@ async def on_message_create(event: interactions.events.MessageCreate):
     target_db = await get_user(discord_id=target_id)
 
     if target_db is None:
-        user_waiting_reply[msg.author.id] = [False, None]
+        await end_admin_session(msg.author.id)
         return await msg.channel.send("User not found.", ephemeral=True)
 
-    await update_user_balance(target_id, amount)
-    await msg.channel.send(f"Balance updated: **{amount}** for **{target_db[2]}**.", ephemeral=True)
+    async with locks.hold(target_id):
+        await update_user_balance(target_id, amount)
+    await msg.channel.send(f"Balance updated: **{amount}** for **{target_db.discord_username}**.", ephemeral=True)
 
-    user_waiting_reply[msg.author.id] = [False, None]
+    await end_admin_session(msg.author.id)
 
 
 # ============================================================
@@ -1048,10 +3102,82 @@ async def set_job_admin_channel(ctx: interactions.SlashContext, channel_id: int)
     await change_config(job_admin_channel_id=channel_id)
     await ctx.send("Job admin channel set.", ephemeral=True)
 
+@config.subcommand(
+    sub_cmd_name="set-tax",
+    sub_cmd_description="Set the periodic wealth tax"
+)
+@interactions.slash_option(
+    name="rate_bp",
+    description="Tax in basis points of the balance above the threshold (100 = 1%, 0 = off)",
+    opt_type=interactions.OptionType.INTEGER,
+    required=True,
+    min_value=0,
+    max_value=10000
+)
+@interactions.slash_option(
+    name="threshold",
+    description="Balance exempt from the tax",
+    opt_type=interactions.OptionType.INTEGER,
+    required=True,
+    min_value=0
+)
+@interactions.slash_option(
+    name="interval_hours",
+    description="Hours between two sweeps (0 = manual only)",
+    opt_type=interactions.OptionType.INTEGER,
+    required=True,
+    min_value=0
+)
+async def set_tax(ctx: interactions.SlashContext, rate_bp: int, threshold: int, interval_hours: int):
+    """Set the tax rate, threshold and interval."""
+    await set_meta("tax_rate_bp", str(rate_bp))
+    await set_meta("tax_threshold", str(threshold))
+    await set_meta("tax_interval", str(interval_hours * 3600))
+    await ctx.send("Tax settings saved.", ephemeral=True)
+
+
+# ============================================================
+#                    INTERACTION RECORDING
+# ============================================================
+
+class InteractionRecorder:
+    """Appends raw interaction payloads and their arrival time to a JSONL file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, payload: dict):
+        # The interaction token would let anyone reading the file answer as the bot
+        payload = {key: value for key, value in payload.items() if key != "token"}
+        self._file.write(json.dumps({"t": time.time(), "payload": payload}) + "\n")
+        self._file.flush()
+
+
+async def record_interaction(event: interactions.events.RawGatewayEvent):
+    recorder.record(event.data)
+
+
+def start_recording():
+    global recorder
+    if RECORD_PATH:
+        recorder = InteractionRecorder(RECORD_PATH)
+        bot.add_listener(interactions.Listener.create("raw_interaction_create")(record_interaction))
+        print(f"Recording interactions to {RECORD_PATH}.")
+
 
 # ============================================================
 #                           START BOT
 # ============================================================
 
-asyncio.run(init_db())
-bot.start()
\ No newline at end of file
+async def main():
+    """Warm up the database and caches concurrently with the gateway connect."""
+    global startup_task
+    start_recording()
+    startup_task = asyncio.create_task(warm_up())
+    if INTERACTIONS_WORKERS:
+        await start_interaction_workers()
+    await bot.astart()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""
+Replays interactions recorded with RECORD_INTERACTIONS=<file.jsonl> against a
+copy of bank.db and reports handler latency.
+
+    python replay.py recording.jsonl --db bank.db --speed 10 --report run.json
+
+Discord itself is replaced by a sink that accepts every call, and Mojang profile
+lookups are answered from the usernames and UUIDs in the database copy and the
+recorded link modals, so only the bot's own work (handlers, locks, SQLite) is
+measured and no request leaves the machine.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import itertools
+import interactions
+
+import main
+
+
+# ============================================================
+#                       DISCORD SINK
+# ============================================================
+
+snowflakes = itertools.count(1 << 40)
+
+
+class ReplayMessage:
+    def __init__(self, message_id: int = None):
+        self.id = message_id or next(snowflakes)
+
+    async def edit(self, *args, **kwargs):
+        return self
+
+
+class ReplayChannel:
+    def __init__(self, channel_id: int = None, channel_type: int = interactions.ChannelType.GUILD_TEXT):
+        self.id = channel_id or next(snowflakes)
+        self.type = channel_type
+
+    async def send(self, *args, **kwargs):
+        return ReplayMessage()
+
+
+class ReplayUser:
+    def __init__(self, data: dict):
+        self.id = int(data["id"])
+        self.username = data.get("username", str(self.id))
+        self.bot = data.get("bot", False)
+        self.mention = f"<@{self.id}>"
+
+
+class ReplayRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+
+class ReplayGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.default_role = ReplayRole(guild_id)
+        self.filesize_limit = 25 * 1024 * 1024
+
+    @property
+    def channels(self):
+        return [ReplayChannel(main.CATEGORY_ID, interactions.ChannelType.GUILD_CATEGORY)]
+
+    async def create_text_channel(self, *args, **kwargs):
+        return ReplayChannel()
+
+
+class ReplayHTTP:
+    """Accepts any HTTP call the handlers make directly."""
+
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            return {}
+        return call
+
+
+class ReplayContext:
+    """The parts of an interactions context the handlers use, built from a raw payload."""
+
+    def __init__(self, payload: dict):
+        data = payload.get("data", {})
+        user = payload.get("member", {}).get("user") or payload.get("user", {"id": 0})
+        self.id = int(payload.get("id", 0))
+        self.author = self.user = ReplayUser(user)
+        self.guild = ReplayGuild(int(payload.get("guild_id", 0)))
+        self.channel = ReplayChannel(int(payload.get("channel_id", 0)))
+        self.message = ReplayMessage(int(payload["message"]["id"])) if "message" in payload else None
+        self.custom_id = data.get("custom_id")
+        self.invoke_target = None
+        self.client = main.bot
+        self.kwargs = {}
+        self.focussed = None
+        self.responses = {
+            component["custom_id"]: component.get("value")
+            for row in data.get("components", [])
+            for component in row.get("components", [])
+        }
+
+    @property
+    def input_text(self):
+        return self.kwargs.get(self.focussed, "")
+
+    async def send(self, *args, **kwargs):
+        return ReplayMessage()
+
+    async def send_modal(self, *args, **kwargs):
+        pass
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+
+def known_profiles(entries: list):
+    """Minecraft username -> UUID (hex) for every linked player and every name typed into the link modal."""
+    db = sqlite3.connect("bank.db")
+    profiles = {name.lower(): uuid.hex() for name, uuid in db.execute("SELECT minecraft_username, minecraft_uuid FROM users")}
+    db.close()
+    for entry in entries:
+        responses = ReplayContext(entry["payload"]).responses
+        if responses.get("minecraft_username") and responses.get("minecraft_uuid"):
+            profiles.setdefault(responses["minecraft_username"].lower(), responses["minecraft_uuid"].lower())
+    return profiles
+
+
+def install_sink(profiles: dict):
+    async def get_minecraft_profile(username: str):
+        uuid = profiles.get(username.lower())
+        if uuid is None:
+            return {"exists": False, "uuid": None, "username": None}
+        return {"exists": True, "uuid": uuid, "username": username}
+    main.get_minecraft_profile = get_minecraft_profile
+
+    main.bot.http = ReplayHTTP()
+    main.bot.get_channel = lambda channel_id: ReplayChannel(channel_id)
+
+    async def fetch_channel(channel_id, **kwargs):
+        return ReplayChannel(channel_id)
+    main.bot.fetch_channel = fetch_channel
+
+
+# ============================================================
+#                          ROUTING
+# ============================================================
+
+def build_routes():
+    """Maps custom IDs and command paths to the handlers registered in main.py."""
+    components, commands = {}, {}
+    for obj in vars(main).values():
+        if isinstance(obj, interactions.ComponentCommand):
+            for custom_id in obj.listeners:
+                components[custom_id] = obj.callback
+        elif isinstance(obj, interactions.SlashCommand):
+            path = " ".join(str(part) for part in (obj.name, obj.group_name, obj.sub_cmd_name) if part)
+            commands[path] = obj
+    return components, commands
+
+
+def flatten_options(data: dict):
+    """Returns the full command path and the leaf option values of a command payload."""
+    path = [data["name"]]
+    options = data.get("options", [])
+    while options and options[0]["type"] in (interactions.OptionType.SUB_COMMAND, interactions.OptionType.SUB_COMMAND_GROUP):
+        path.append(options[0]["name"])
+        options = options[0].get("options", [])
+    return " ".join(path), options
+
+
+def resolve(data: dict, option: dict):
+    if option["type"] == interactions.OptionType.USER:
+        return ReplayUser(data.get("resolved", {}).get("users", {}).get(option["value"], {"id": option["value"]}))
+    return option["value"]
+
+
+def route(payload: dict, components: dict, commands: dict):
+    """Returns (label, coroutine) for a recorded payload, or None if nothing handles it."""
+    ctx = ReplayContext(payload)
+    data = payload.get("data", {})
+
+    if payload["type"] in (interactions.InteractionType.MESSAGE_COMPONENT, interactions.InteractionType.MODAL_SUBMIT):
+        handler = components.get(ctx.custom_id)
+        return (ctx.custom_id, handler(ctx)) if handler else None
+
+    path, options = flatten_options(data)
+    command = commands.get(path)
+    if command is None:
+        return None
+    ctx.invoke_target = path
+    ctx.kwargs = {option["name"]: resolve(data, option) for option in options}
+
+    if payload["type"] == interactions.InteractionType.AUTOCOMPLETE:
+        ctx.focussed = next((option["name"] for option in options if option.get("focused")), None)
+        autocomplete = command.autocomplete_callbacks.get(ctx.focussed)
+        return (f"/{path} [{ctx.focussed}]", autocomplete(ctx)) if autocomplete else None
+
+    return f"/{path}", command.callback(ctx, **ctx.kwargs)
+
+
+# ============================================================
+#                          REPLAY
+# ============================================================
+
+def load_recording(path: str):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def percentile(values: list, fraction: float):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def replay(entries: list, speed: float):
+    """Feeds entries into the handlers at their recorded pace divided by `speed` (0 = no waiting)."""
+    components, commands = build_routes()
+    latencies, errors, skipped = {}, {}, 0
+
+    async def run(label: str, coroutine):
+        start = time.perf_counter()
+        try:
+            await coroutine
+        except Exception as e:
+            errors[label] = errors.get(label, 0) + 1
+            print(f"{label}: {type(e).__name__}: {e}")
+        latencies.setdefault(label, []).append(time.perf_counter() - start)
+
+    tasks = []
+    first_t = entries[0]["t"] if entries else 0
+    start = time.monotonic()
+    for entry in entries:
+        if speed > 0:
+            await asyncio.sleep(max(0, (entry["t"] - first_t) / speed - (time.monotonic() - start)))
+        routed = route(entry["payload"], components, commands)
+        if routed is None:
+            skipped += 1
+            continue
+        tasks.append(asyncio.create_task(run(*routed)))
+    await asyncio.gather(*tasks)
+
+    report = {}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        report[label] = {
+            "count": len(values),
+            "errors": errors.get(label, 0),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    return report, skipped, time.monotonic() - start
+
+
+def copy_db(source: str, workdir: str):
+    """Snapshot the database with the backup API so the live file is never touched."""
+    source_db = sqlite3.connect(source)
+    target_db = sqlite3.connect(os.path.join(workdir, "bank.db"))
+    with target_db:
+        source_db.backup(target_db)
+    source_db.close()
+    target_db.close()
+
+
+async def run_replay(args):
+    await main.warm_up()
+    entries = load_recording(args.recording)
+    install_sink(known_profiles(entries))
+    report, skipped, duration = await replay(entries, args.speed)
+
+    print(f"Replayed in {duration:.2f}s ({skipped} interactions without handler skipped).")
+    for label, stats in report.items():
+        print(f"{label:40} n={stats['count']:<6} err={stats['errors']:<4} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded interactions against a copy of bank.db.")
+    parser.add_argument("recording", help="JSONL file written with RECORD_INTERACTIONS")
+    parser.add_argument("--db", default="bank.db", help="database to copy (default: bank.db)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, 0 for no waiting")
+    parser.add_argument("--report", help="write per-handler latency stats to this JSON file")
+    args = parser.parse_args()
+
+    args.recording = os.path.abspath(args.recording)
+    args.report = os.path.abspath(args.report) if args.report else None
+    workdir = tempfile.mkdtemp(prefix="bank-replay-")
+    copy_db(os.path.abspath(args.db), workdir)
+    os.chdir(workdir)
+    print(f"Replaying against a copy of {args.db} in {workdir}.")
+
+    try:
+        asyncio.run(run_replay(args))
+    except KeyboardInterrupt:
+        sys.exit(1)